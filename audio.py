@@ -0,0 +1,68 @@
+import os
+import threading
+import pygame
+
+# Sound for every event the world reports:
+# file, volume, most copies playing at once, most copies started in one frame
+SOUNDS = {
+    "paintball_shot": ("paintball_shot.wav", 0.9, 4, 1),      # AR-15
+    "long_range_sound": ("long_range_sound.wav", 0.9, 2, 1),  # Sniper
+    "target_shot": ("target_shot.wav", 0.7, 4, 2),            # Many targets can fire in one frame
+    "player_hit": ("player_hit.wav", 0.8, 2, 1),
+    "game_over": ("game_over.wav", 1.0, 1, 1),
+}
+CHANNELS = 16  # Mixer channels; enough for every sound at its voice cap
+
+class AudioManager:
+    """
+    Plays the game's sound effects without holding up frames
+    The sound files are loaded on a background thread, so the window opens straight away.
+    play() only queues a sound; flush() starts the queued ones once per frame, skipping copies
+    beyond each sound's voice cap and per-frame limit, so a volley of target shots cannot take
+    over the mixer. Without an audio device every call does nothing
+    """
+    def __init__(self, directory, sounds=SOUNDS):
+        self.sounds = sounds
+        self.clips = {}       # Event name -> loaded pygame Sound, filled in by the loader thread
+        self.queued = {}      # Event name -> times it was played since the last flush
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            pygame.mixer.set_num_channels(CHANNELS)
+        except pygame.error:
+            self.enabled = False  # No audio device: play silently
+            return
+        self.enabled = True
+        self.loader = threading.Thread(target=self._load, args=(directory,), daemon=True)
+        self.loader.start()
+
+    def _load(self, directory):
+        """Load every sound file (runs on the loader thread); missing or broken files stay silent"""
+        missing = []
+        for name, (filename, volume, _, _) in self.sounds.items():
+            try:
+                clip = pygame.mixer.Sound(os.path.join(directory, filename))
+            except (pygame.error, FileNotFoundError):
+                missing.append(filename)
+                continue
+            clip.set_volume(volume)
+            self.clips[name] = clip
+        if missing:
+            print(f"Warning: could not load {', '.join(missing)}; those sounds are off")
+
+    def play(self, name):
+        """Queue the sound for event name to start at the next flush"""
+        if self.enabled:
+            self.queued[name] = self.queued.get(name, 0) + 1
+
+    def flush(self):
+        """Start this frame's queued sounds, within each sound's voice cap and per-frame limit"""
+        for name, count in self.queued.items():
+            clip = self.clips.get(name)  # None until loaded (or if it failed to load)
+            if clip is None:
+                continue
+            _, _, max_voices, max_per_frame = self.sounds[name]
+            free_voices = max_voices - clip.get_num_channels()
+            for _ in range(min(count, max_per_frame, free_voices)):
+                clip.play()
+        self.queued.clear()
@@ -0,0 +1,204 @@
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import world as world_module
+from weapons import WEAPONS
+from world import GameWorld, PlayerInput, TICK
+
+# Balance sweeps: every combination of the tuning values given on the command line is
+# played many times by a scripted bot, spread over all CPU cores, e.g.
+#
+#   python balance.py --param medium.damage=25,50,75 --param TARGET_SPEED=30,60 --matches 500
+#
+# Each worker process sets the world module's tuning constants and the weapon table's entries
+# for the config it is given (the game reads them at the moment they are used), so no game
+# code needs to know about sweeps.
+
+# Weapon parameters a sweep may change, as weapon.field (e.g. long.fire_delay)
+WEAPON_FIELDS = ("damage", "range", "projectile_speed", "spread", "fire_delay", "move_speed")
+WORLD_TUNABLES = ("TARGET_SPEED", "TARGET_SHOOTING_RANGE", "GRACE_PERIOD_DURATION",
+                  "WAVE_SPEED_GROWTH", "WAVE_FIRE_RATE_GROWTH")
+# Everything a sweep may change, in the game's own units (seconds, pixels per second...);
+# weapon values are in the units of weapons.json, so spread is in degrees
+TUNABLES = tuple(f"{weapon}.{field}" for weapon in WEAPONS.names for field in WEAPON_FIELDS) + WORLD_TUNABLES
+DEFAULTS = {name: getattr(world_module, name) for name in WORLD_TUNABLES}  # In the game's units (spread in radians)
+DEFAULTS.update({f"{weapon}.{field}": float(getattr(WEAPONS, field)[i])
+                 for i, weapon in enumerate(WEAPONS.names) for field in WEAPON_FIELDS})
+
+MAX_MATCH_TIME = 120  # Matches the bot survives this long (simulated seconds) are stopped there
+
+class PlayerBot:
+    """
+    Scripted player for headless matches: aims at the nearest target and shoots whenever it
+    can, backs away from targets that get close and otherwise circles, holding the weapon
+    with the most damage per second among those that reach the target (the longest ranged
+    one when none does). With the standard weapons that is the AR-15 in its range and the
+    sniper beyond it
+    """
+    def __init__(self, keep_away=200, circle_period=2.0):
+        self.keep_away = keep_away           # Back off from targets closer than this (pixels)
+        self.circle_period = circle_period   # Seconds between changes of circling direction
+
+    def inputs(self, world):
+        """The bot's PlayerInput for the next tick of world"""
+        player = world.player
+        targets = world.targets
+        live = targets.live()
+        center_x = player.x + player.width // 2
+        center_y = player.y + player.height // 2
+        if not len(live):
+            return PlayerInput(aim_x=center_x, aim_y=center_y)
+
+        # Nearest target center
+        dx = targets.x[live] + targets.width // 2 - center_x
+        dy = targets.y[live] + targets.height // 2 - center_y
+        distance = np.hypot(dx, dy)
+        nearest = int(np.argmin(distance))
+        dx, dy, distance = float(dx[nearest]), float(dy[nearest]), float(distance[nearest])
+
+        weapon = self.choose_weapon(distance)
+        if distance < self.keep_away:
+            # Move directly away from the target
+            move_x, move_y = -dx, -dy
+        else:
+            # Circle around it, changing direction now and then
+            direction = 1 if int(world.time / self.circle_period) % 2 else -1
+            move_x, move_y = -dy * direction, dx * direction
+        return PlayerInput(up=move_y < 0, down=move_y > 0, left=move_x < 0, right=move_x > 0,
+                           fire=True, aim_x=center_x + dx, aim_y=center_y + dy,
+                           weapon=weapon if weapon != player.weapon else None)
+
+    def choose_weapon(self, distance):
+        """Index of the weapon to shoot a target distance pixels away with"""
+        # Read from the table each time, as a sweep may have changed it
+        reaches = WEAPONS.range >= distance
+        if not reaches.any():
+            return int(np.argmax(WEAPONS.range))
+        damage_per_second = WEAPONS.damage * WEAPONS.pellets / WEAPONS.fire_delay
+        return int(np.argmax(np.where(reaches, damage_per_second, -np.inf)))
+
+def play_match(seed, max_time=MAX_MATCH_TIME, bot=None):
+    """Play one headless match with the bot and return its survival time, score and shot counts"""
+    bot = bot or PlayerBot()
+    match = GameWorld(seed=seed)
+    while not match.game_over and match.time < max_time:
+        match.step(TICK, bot.inputs(match))
+    player = match.player
+    return {"survival_time": match.time, "score": player.score,
+            "shots_fired": player.shots_fired, "shots_hit": player.shots_hit,
+            "died": match.game_over}
+
+def run_matches(config, first_seed, count, max_time=MAX_MATCH_TIME):
+    """
+    Play count matches with the tuning values in config (tunable name -> value)
+    Runs in a worker process; tunables not in config are put back to their defaults first
+    """
+    for name in TUNABLES:
+        weapon, _, field = name.partition(".")
+        if name not in config:
+            value = DEFAULTS[name]
+        elif field == "spread":
+            value = math.radians(config[name])  # The table holds radians, as WeaponTable converts them
+        else:
+            value = config[name]
+        if field:
+            getattr(WEAPONS, field)[WEAPONS.index[weapon]] = value
+        else:
+            setattr(world_module, name, value)
+    return [play_match(first_seed + i, max_time) for i in range(count)]
+
+def summarize(config, results):
+    """Aggregate the match results of one config"""
+    survival = np.array([r["survival_time"] for r in results])
+    scores = np.array([r["score"] for r in results])
+    fired = sum(r["shots_fired"] for r in results)
+    hit = sum(r["shots_hit"] for r in results)
+    summary = dict(config)
+    summary.update({
+        "matches": len(results),
+        "survival_mean": float(survival.mean()),
+        "survival_p10": float(np.percentile(survival, 10)),
+        "survival_p90": float(np.percentile(survival, 90)),
+        "score_mean": float(scores.mean()),
+        "score_max": int(scores.max()),
+        "accuracy": hit / fired if fired else 0.0,
+        "death_rate": sum(r["died"] for r in results) / len(results),
+    })
+    return summary
+
+def parameter_grid(params):
+    """Every combination of the swept values, as a list of configs"""
+    names = list(params)
+    return [dict(zip(names, values)) for values in itertools.product(*(params[n] for n in names))]
+
+def sweep(params, matches, seed=0, max_time=MAX_MATCH_TIME, workers=None, chunk=10):
+    """
+    Play every config of the grid on a process pool and return their summaries in grid order
+    Each config's matches are split into tasks of chunk matches, so even a small grid keeps
+    every core busy. Every config plays the same seeds, so configs are compared on equal terms
+    """
+    configs = parameter_grid(params)
+    tasks = [(i, first) for i in range(len(configs)) for first in range(0, matches, chunk)]
+    results = [[] for _ in configs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        done = pool.map(run_matches, (configs[i] for i, _ in tasks),
+                        (seed + first for _, first in tasks),
+                        (min(chunk, matches - first) for _, first in tasks),
+                        itertools.repeat(max_time))
+        for (i, _), chunk_results in zip(tasks, done):
+            results[i].extend(chunk_results)
+    return [summarize(config, config_results) for config, config_results in zip(configs, results)]
+
+def parse_param(text):
+    """Parse NAME=v1,v2,... from the command line"""
+    name, _, values = text.partition("=")
+    if name not in TUNABLES:
+        raise argparse.ArgumentTypeError(f"{name} is not tunable; choose from {', '.join(TUNABLES)}")
+    try:
+        return name, [float(v) for v in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"values for {name} must be numbers, got {values!r}")
+
+def save(results, path):
+    """Write sweep results to path, as JSON if it ends in .json and CSV otherwise"""
+    if path.lower().endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep tuning constants with bot matches on every CPU core")
+    parser.add_argument("--param", type=parse_param, action="append", default=[],
+                        help=f"NAME=v1,v2,... to sweep; NAME is one of {', '.join(TUNABLES)}")
+    parser.add_argument("--matches", type=int, default=100, help="matches played per config")
+    parser.add_argument("--max-time", type=float, default=MAX_MATCH_TIME,
+                        help="stop matches the bot survives this long (simulated seconds)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the first match; every config plays the same seeds")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--chunk", type=int, default=10, help="matches per task handed to a worker")
+    parser.add_argument("--output", default="sweep.csv", help="results file (.csv or .json)")
+    args = parser.parse_args()
+
+    params = dict(args.param)
+    configs = len(parameter_grid(params))
+    print(f"{configs} configs x {args.matches} matches on {args.workers or os.cpu_count()} processes")
+    start = time.perf_counter()
+    results = sweep(params, args.matches, args.seed, args.max_time, args.workers, args.chunk)
+    print(f"done in {time.perf_counter() - start:.1f}s")
+    for result in sorted(results, key=lambda r: r["survival_mean"]):
+        settings = ", ".join(f"{name}={result[name]:g}" for name in params)
+        print(f"{settings or 'defaults'}: survival {result['survival_mean']:.1f}s, "
+              f"score {result['score_mean']:.1f}, accuracy {result['accuracy']:.0%}, "
+              f"deaths {result['death_rate']:.0%}")
+    save(results, args.output)
@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# The game modules live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from world import TICK
+from profiler import FrameProfiler, PHASES
+from scenarios import SCENARIOS
+
+# Steps every scenario headless and reports how expensive a tick is. Compared against a
+# stored baseline it exits with status 1 when a scenario got slower or hungrier than allowed:
+#
+#   python benchmarks/run.py                     # run and compare with benchmarks/baseline.json
+#   python benchmarks/run.py --update-baseline   # store this machine's results as the baseline
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+WARMUP_TICKS = 120          # Untimed ticks first, so one-off setup costs don't count
+ALLOCATION_TICKS = 300      # Ticks traced by tracemalloc (tracing is slow, so fewer of them)
+BENCHMARK_HEALTH = 1e9      # The player is kept alive so every scenario runs to the end
+
+def step_scenario(scenario, world, first_tick, ticks, profiler=None):
+    """Step world through ticks first_tick .. first_tick + ticks - 1 of scenario"""
+    for tick in range(first_tick, first_tick + ticks):
+        world.player.health = BENCHMARK_HEALTH
+        inputs = scenario.inputs(world, tick)
+        if profiler:
+            profiler.begin_frame()
+        world.step(TICK, inputs)
+        if profiler:
+            profiler.end_frame(world)
+
+def measure(scenario, ticks, seed):
+    """Run scenario and return its tick costs, phase breakdown and allocation figures"""
+    world = scenario.create_world(seed)
+    step_scenario(scenario, world, 0, WARMUP_TICKS)
+
+    # Timed run: every tick is one profiler frame
+    profiler = FrameProfiler(capacity=ticks)
+    world.profiler = profiler
+    start = time.perf_counter()
+    step_scenario(scenario, world, WARMUP_TICKS, ticks, profiler)
+    elapsed = time.perf_counter() - start
+    world.profiler = None
+    tick_ms = profiler.work_times * 1000
+
+    # Allocation run: memory blocks still held afterwards and the peak while stepping
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    step_scenario(scenario, world, WARMUP_TICKS + ticks, ALLOCATION_TICKS)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = after.compare_to(before, "filename")
+
+    return {
+        "ticks": ticks,
+        "ticks_per_sec": ticks / elapsed,
+        "p50_ms": float(np.percentile(tick_ms, 50)),
+        "p95_ms": float(np.percentile(tick_ms, 95)),
+        "p99_ms": float(np.percentile(tick_ms, 99)),
+        "max_ms": float(tick_ms.max()),
+        "phase_ms_mean": dict(zip(PHASES, (profiler.phase_times.mean(axis=0) * 1000).tolist())),
+        "retained_blocks": sum(stat.count_diff for stat in retained),
+        "peak_kib": (peak_memory - start_memory) / 1024,
+        "targets": len(world.targets),
+        "projectiles": len(world.projectiles),
+    }
+
+def regressions(name, result, baseline, tolerance):
+    """Descriptions of every way result is worse than baseline by more than tolerance (a fraction)"""
+    found = []
+    if result["ticks_per_sec"] < baseline["ticks_per_sec"] * (1 - tolerance):
+        found.append(f"{name}: {result['ticks_per_sec']:.0f} ticks/s, baseline {baseline['ticks_per_sec']:.0f}")
+    if result["p99_ms"] > baseline["p99_ms"] * (1 + tolerance):
+        found.append(f"{name}: p99 {result['p99_ms']:.3f} ms, baseline {baseline['p99_ms']:.3f} ms")
+    # Small allocations jitter, so memory only counts as regressed beyond a 64 KiB margin too
+    if result["peak_kib"] > baseline["peak_kib"] * (1 + tolerance) + 64:
+        found.append(f"{name}: peak {result['peak_kib']:.0f} KiB, baseline {baseline['peak_kib']:.0f} KiB")
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game simulation headless")
+    parser.add_argument("--ticks", type=int, default=2000, help="timed ticks per scenario")
+    parser.add_argument("--seed", type=int, default=1, help="world seed used by every scenario")
+    parser.add_argument("--scenario", action="append", default=None,
+                        help="only run this scenario (can be given more than once)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a result counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write these results to the baseline file instead of comparing")
+    parser.add_argument("--output", default=None, help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    if not scenarios:
+        parser.error(f"no scenario named {args.scenario}; choose from "
+                     f"{', '.join(s.name for s in SCENARIOS)}")
+
+    results = {}
+    print(f"{'scenario':<16}{'ticks/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'blocks':>8}{'peak KiB':>10}")
+    for scenario in scenarios:
+        result = results[scenario.name] = measure(scenario, args.ticks, args.seed)
+        print(f"{scenario.name:<16}{result['ticks_per_sec']:>9.0f}{result['p50_ms']:>9.3f}"
+              f"{result['p95_ms']:>9.3f}{result['p99_ms']:>9.3f}{result['max_ms']:>9.3f}"
+              f"{result['retained_blocks']:>8}{result['peak_kib']:>10.0f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)  # Scenarios not run keep their old baseline
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    found = []
+    for name, result in results.items():
+        if name in baseline:
+            found.extend(regressions(name, result, baseline[name], args.tolerance))
+        else:
+            print(f"{name}: no baseline yet")
+    for message in found:
+        print(f"REGRESSION {message}")
+    if found:
+        return 1
+    print("No regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import math
+from weapons import WEAPONS
+from world import GameWorld, PlayerInput, ARENA_WIDTH, ARENA_HEIGHT, OBSTACLES_PER_CHUNK
+
+# Scripted situations the benchmark steps the world through. Each scenario says how to
+# build its world and what the player does on every tick; run.py takes care of timing.
+
+class Scenario:
+    """
+    One scripted benchmark situation
+    inputs(world, tick) returns the PlayerInput for a tick. It may also change the world
+    directly to set up a situation the player could not reach by input alone
+    """
+    def __init__(self, name, description, inputs, num_targets=3, num_obstacles=6,
+                 width=ARENA_WIDTH, height=ARENA_HEIGHT, chunked=False):
+        self.name = name
+        self.description = description
+        self.inputs = inputs
+        self.num_targets = num_targets
+        self.num_obstacles = num_obstacles
+        self.width = width
+        self.height = height
+        self.chunked = chunked
+
+    def create_world(self, seed):
+        """A fresh world for this scenario, past its grace period so targets act at once"""
+        world = GameWorld(self.width, self.height, self.num_targets, self.num_obstacles,
+                          seed=seed, chunked=self.chunked)
+        world.grace_period = False
+        return world
+
+def aim_around(world, tick, turn_rate=0.05, distance=300):
+    """Aim point circling the player, so shots go in every direction over time"""
+    player = world.player
+    angle = tick * turn_rate
+    return (player.x + player.width // 2 + math.cos(angle) * distance,
+            player.y + player.height // 2 + math.sin(angle) * distance)
+
+def strafe(tick, period=240):
+    """Move left and right in turns so chasing targets keep turning"""
+    return (tick // period) % 2 == 0
+
+def chase_inputs(world, tick):
+    left = strafe(tick)
+    return PlayerInput(left=left, right=not left)
+
+def ar15_inputs(world, tick):
+    aim_x, aim_y = aim_around(world, tick)
+    left = strafe(tick)
+    return PlayerInput(left=left, right=not left, fire=True, aim_x=aim_x, aim_y=aim_y,
+                       weapon=WEAPONS.index["medium"] if tick == 0 else None)
+
+def sniper_inputs(world, tick):
+    # Sweep quickly so each sniper round flies a different long path across the arena
+    aim_x, aim_y = aim_around(world, tick, turn_rate=0.3)
+    return PlayerInput(fire=True, aim_x=aim_x, aim_y=aim_y, weapon=WEAPONS.index["long"] if tick == 0 else None)
+
+def shotgun_inputs(world, tick):
+    aim_x, aim_y = aim_around(world, tick)
+    left = strafe(tick)
+    return PlayerInput(left=left, right=not left, fire=True, aim_x=aim_x, aim_y=aim_y,
+                       weapon=WEAPONS.index["shotgun"] if tick == 0 else None)
+
+def dense_obstacle_inputs(world, tick):
+    aim_x, aim_y = aim_around(world, tick)
+    up = strafe(tick, period=120)
+    return PlayerInput(up=up, down=not up, fire=True, aim_x=aim_x, aim_y=aim_y)
+
+def big_map_inputs(world, tick):
+    # Run diagonally across the map, so new chunks keep coming into play
+    aim_x, aim_y = aim_around(world, tick)
+    return PlayerInput(right=True, down=strafe(tick, period=600), fire=True, aim_x=aim_x, aim_y=aim_y)
+
+def restart_inputs(world, tick):
+    # Every 30 ticks press SPACE; every other time after a game over, so a new arena is built
+    restart = tick % 30 == 29
+    if restart and tick % 60 == 59:
+        world.game_over = True
+    return PlayerInput(restart=restart)
+
+SCENARIOS = [
+    Scenario("chase", "200 targets chasing and shooting at a strafing player",
+             chase_inputs, num_targets=200),
+    Scenario("ar15", "sustained AR-15 fire at 50 targets while strafing",
+             ar15_inputs, num_targets=50),
+    Scenario("sniper", "sniper volleys across the arena at 50 targets",
+             sniper_inputs, num_targets=50),
+    Scenario("shotgun", "shotgun blasts of 8 pellets at 50 targets while strafing",
+             shotgun_inputs, num_targets=50),
+    Scenario("dense_obstacles", "AR-15 fire and 30 chasing targets among 100 obstacles",
+             dense_obstacle_inputs, num_targets=30, num_obstacles=100),
+    Scenario("restart", "SPACE every 30 ticks, rebuilding the arena on every other press",
+             restart_inputs),
+    Scenario("big_map", "AR-15 fire and 20 targets while crossing a 20000x20000 chunked map",
+             big_map_inputs, num_targets=20, num_obstacles=OBSTACLES_PER_CHUNK,
+             width=20000, height=20000, chunked=True),
+]
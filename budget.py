@@ -0,0 +1,58 @@
+import numpy as np
+
+# Hard limits the governor never raises the caps past, and floors it never cuts them below
+MAX_TARGETS = 200
+MAX_PROJECTILES = 1000
+MIN_TARGETS = 3
+MIN_PROJECTILES = 50
+
+ADJUST_INTERVAL = 60   # Ticks measured between adjustments (half a second)
+CUT = 0.2              # Fraction the caps drop by when ticks are over budget
+HEADROOM = 0.6         # Caps only rise while ticks take less than this fraction of the budget
+TARGET_STEP = 2        # How far the caps rise per adjustment
+PROJECTILE_STEP = 20
+
+class BudgetGovernor:
+    """
+    Caps the live targets and projectiles so ticks stay within a time budget
+    The cost of every tick goes into observe(). Every ADJUST_INTERVAL ticks the 90th
+    percentile of the measured ticks is compared with the budget: over it, both caps drop
+    to CUT below the number actually alive at once; well under it, they rise by a few at a
+    time back towards their limits.
+    Dropping fast and recovering slowly keeps frame drops short as the waves grow, and
+    the waves only get as big as the machine can run
+    """
+    def __init__(self, tick_budget, max_targets=MAX_TARGETS, max_projectiles=MAX_PROJECTILES):
+        self.tick_budget = tick_budget         # Seconds a tick may take
+        self.max_targets = max_targets         # Limits the caps rise back to
+        self.max_projectiles = max_projectiles
+        self.target_cap = max_targets          # Current caps
+        self.projectile_cap = max_projectiles
+        self.times = np.zeros(ADJUST_INTERVAL)  # Costs of the ticks since the last adjustment
+        self.count = 0
+
+    def observe(self, seconds, num_targets, num_projectiles):
+        """
+        Record how long a tick took and how many targets and projectiles were alive
+        Returns True when the caps changed, so they must be passed on to the world
+        (world.set_budget(governor.target_cap, governor.projectile_cap))
+        """
+        self.times[self.count] = seconds
+        self.count += 1
+        if self.count < ADJUST_INTERVAL:
+            return False
+        self.count = 0
+        return self.adjust(np.percentile(self.times, 90), num_targets, num_projectiles)
+
+    def adjust(self, tick_time, num_targets, num_projectiles):
+        """Move the caps according to a typical recent tick time; returns whether they changed"""
+        caps = (self.target_cap, self.projectile_cap)
+        if tick_time > self.tick_budget:
+            # Cut from what is alive, as a cap far above it would take many cuts to matter
+            self.target_cap = max(MIN_TARGETS, int(min(self.target_cap, num_targets) * (1 - CUT)))
+            self.projectile_cap = max(MIN_PROJECTILES,
+                                      int(min(self.projectile_cap, num_projectiles) * (1 - CUT)))
+        elif tick_time < self.tick_budget * HEADROOM:
+            self.target_cap = min(self.max_targets, self.target_cap + TARGET_STEP)
+            self.projectile_cap = min(self.max_projectiles, self.projectile_cap + PROJECTILE_STEP)
+        return (self.target_cap, self.projectile_cap) != caps
@@ -0,0 +1,70 @@
+import math
+import numpy as np
+
+CHUNK_SIZE = 512       # Side length of a square chunk in pixels
+OBSTACLE_SIZE = 60     # Same size as the Obstacle class
+
+class ChunkedObstacles:
+    """
+    Obstacles of an arena too big to keep in play all at once, stored in square chunks
+    A chunk's obstacles are generated the first time anything asks for them, from a random
+    stream seeded by the map seed and the chunk's coordinates, so every chunk comes out the
+    same whenever and in whatever order it is loaded. Only the chunks near the player are
+    ever loaded, so a map can hold tens of thousands of obstacles without any cost until
+    the player gets close to them
+    """
+    def __init__(self, width, height, seed, per_chunk, keep_clear=None, chunk_size=CHUNK_SIZE):
+        self.width = width             # Map size in pixels
+        self.height = height
+        self.seed = seed               # Map seed; each chunk derives its own stream from it
+        self.per_chunk = per_chunk     # Obstacles tried per chunk; ones that would overlap are dropped
+        self.keep_clear = keep_clear   # (x, y) point kept clear of obstacles (the player's start)
+        self.chunk_size = chunk_size
+        self.cols = max(1, math.ceil(width / chunk_size))
+        self.rows = max(1, math.ceil(height / chunk_size))
+        self.chunks = {}               # (col, row) -> obstacle boxes of the chunks loaded so far
+
+    def chunk(self, col, row):
+        """Obstacle boxes (rows of x, y, width, height) of chunk col, row, generating it if needed"""
+        boxes = self.chunks.get((col, row))
+        if boxes is None:
+            boxes = self.chunks[(col, row)] = self._generate(col, row)
+        return boxes
+
+    def _generate(self, col, row):
+        """Random obstacles inside chunk col, row that don't overlap each other"""
+        rng = np.random.default_rng((self.seed, col, row))
+        left = col * self.chunk_size
+        top = row * self.chunk_size
+        # Obstacles stay wholly inside their chunk (and the map), so chunks never share one
+        room_x = min(self.chunk_size, self.width - left) - OBSTACLE_SIZE
+        room_y = min(self.chunk_size, self.height - top) - OBSTACLE_SIZE
+        if room_x < 0 or room_y < 0:
+            return np.zeros((0, 4))
+        placed = []
+        for x, y in zip((left + rng.uniform(0, room_x, self.per_chunk)).tolist(),
+                        (top + rng.uniform(0, room_y, self.per_chunk)).tolist()):
+            if any(abs(x - px) < OBSTACLE_SIZE and abs(y - py) < OBSTACLE_SIZE for px, py in placed):
+                continue
+            if self.keep_clear is not None:
+                # Centers 60px apart are enough to keep a 60px obstacle off the 20px player
+                cx, cy = self.keep_clear
+                if math.hypot(x + OBSTACLE_SIZE / 2 - cx, y + OBSTACLE_SIZE / 2 - cy) < OBSTACLE_SIZE:
+                    continue
+            placed.append((round(x), round(y)))
+        boxes = np.full((len(placed), 4), float(OBSTACLE_SIZE))
+        boxes[:, :2] = np.array(placed, dtype=float).reshape(-1, 2)
+        return boxes
+
+    def chunk_range(self, left, top, right, bottom):
+        """Columns and rows (as ranges) of the chunks overlapping the area left, top - right, bottom"""
+        col0 = min(max(int(left // self.chunk_size), 0), self.cols - 1)
+        row0 = min(max(int(top // self.chunk_size), 0), self.rows - 1)
+        col1 = min(max(int(right // self.chunk_size), 0), self.cols - 1)
+        row1 = min(max(int(bottom // self.chunk_size), 0), self.rows - 1)
+        return range(col0, col1 + 1), range(row0, row1 + 1)
+
+    def boxes_in(self, left, top, right, bottom):
+        """Obstacle boxes of every chunk overlapping the area left, top - right, bottom"""
+        cols, rows = self.chunk_range(left, top, right, bottom)
+        return np.concatenate([self.chunk(col, row) for row in rows for col in cols])
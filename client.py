@@ -0,0 +1,379 @@
+import argparse
+import asyncio
+import time
+from collections import deque
+import numpy as np
+import pygame
+import net
+from balance import PlayerBot
+from prediction import Prediction
+from replay import RECORD, pack_input, unpack_input
+from spatial_grid import SpatialGrid
+from targets import TARGET_SIZE
+from weapons import WEAPONS
+from world import (Player, PlayerInput, Medkit, Obstacle, entity_boxes, TICK, TICK_RATE,
+                   ARENA_WIDTH, ARENA_HEIGHT, PROJECTILE_COLORS, WHITE, RED, BLACK)
+
+# Network client: sends this machine's input to a game server (server.py) and draws the
+# snapshots it sends back, e.g.
+#
+#   python client.py --host 127.0.0.1              play in a window
+#   python client.py --local --bot 10              start a server here and let a bot play for 10s
+#   python client.py --local --bot 10 --clients 3  the same with three bots in one arena
+#   python client.py --local --lag 150             play through 150ms of simulated round trip
+
+MAX_FRAME_TIME = 0.25  # Cap on real time caught up per frame, as in shootergame.py
+
+class Mirror:
+    """
+    The entities of one snapshot table, laid out like TargetSwarm and ProjectilePool so the
+    sprite batches and PlayerBot can read them. prev_x and prev_y hold where each entity was
+    in the snapshot before, so it can be drawn moving smoothly between snapshots
+    """
+    def __init__(self, width=0, height=0):
+        self.width = width                     # Entity size, for tables of same-sized entities
+        self.height = height
+        self.ids = np.zeros(0, dtype=np.int32)
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.prev_x = np.zeros(0)
+        self.prev_y = np.zeros(0)
+
+    def update(self, ids, x, y, **columns):
+        """Take the entities of a new snapshot; columns are extra arrays like health"""
+        found, rows = net.match(ids, self.ids)
+        self.prev_x = np.where(found, self.x[rows], x) if len(self.ids) else x
+        self.prev_y = np.where(found, self.y[rows], y) if len(self.ids) else y
+        self.ids, self.x, self.y = ids, x, y
+        for name, values in columns.items():
+            setattr(self, name, values)
+
+    def live(self):
+        """Rows of every entity (all of them are alive)"""
+        return np.arange(len(self.ids))
+
+    def __len__(self):
+        return len(self.ids)
+
+class ClientWorld:
+    """
+    What a client knows of the server's world, rebuilt from every snapshot
+    It has the attributes the renderer, the sprite batches and PlayerBot read from a
+    GameWorld, so the game's drawing code draws it unchanged, and a collision grid of the
+    area in play, so Player.move can run on it for prediction (see prediction.py).
+    player is this client's own player (the first one while it watches)
+    """
+    def __init__(self):
+        self.player = Player(0, 0)
+        self.players = {}                      # Id -> Player, every player in the arena
+        self.targets = Mirror(TARGET_SIZE, TARGET_SIZE)
+        self.projectiles = Mirror()
+        self.medkits = []
+        self.obstacles = []
+        self.width = ARENA_WIDTH
+        self.height = ARENA_HEIGHT
+        self.area = (0, 0, ARENA_WIDTH, ARENA_HEIGHT)  # Left, top, right and bottom of the area in play
+        self.grid = SpatialGrid(ARENA_WIDTH, ARENA_HEIGHT)  # Obstacles static, targets dynamic
+        self.time = 0.0
+        self.wave = 1
+        self.game_over = False
+        self.grace_period = True
+        self.grace_left = 0.0                  # Seconds of grace period left
+        self.arena_version = -1
+
+    def apply(self, tables, player_id):
+        """Take on the state in a decoded snapshot; player_id is this client's player (or NO_PLAYER)"""
+        p = net.POSITION_STEPS
+        (time_, self.wave, game_over, grace_period, grace_left,
+         self.width, self.height, arena_version, *area) = tables["world"][1][0].tolist()
+        self.time = time_ / net.TIME_STEPS
+        self.game_over = bool(game_over)
+        self.grace_period = bool(grace_period)
+        self.grace_left = grace_left / net.TIME_STEPS
+
+        # Players are kept from one snapshot to the next, so each is drawn moving from where it was
+        players = {}
+        ids, values = tables["players"]
+        for id_, (x, y, angle, health, weapon, score, since_shot) in zip(ids.tolist(), values.tolist()):
+            player = players[id_] = self.players.get(id_) or Player(x / p, y / p, id_)
+            player.prev_x, player.prev_y = player.x, player.y
+            player.x, player.y = x / p, y / p
+            player.angle = angle / net.ANGLE_STEPS
+            player.health = health / net.HEALTH_STEPS
+            player.weapon = weapon
+            player.score = score
+            player.last_shot_time = self.time - since_shot / net.TIME_STEPS
+            player.rect.update(player.x, player.y, player.width, player.height)
+        self.players = players
+        self.player = players.get(player_id) or next(iter(players.values()), self.player)
+
+        ids, values = tables["targets"]
+        self.targets.update(ids, values[:, 0] / p, values[:, 1] / p, health=values[:, 2] / net.HEALTH_STEPS,
+                            max_health=values[:, 3] / net.HEALTH_STEPS)
+        ids, values = tables["projectiles"]
+        self.projectiles.update(ids, values[:, 0] / p, values[:, 1] / p,
+                                owner=values[:, 2], radius=values[:, 3])
+        self.medkits = [Medkit(x / p, y / p) for x, y in tables["medkits"][1].tolist()]
+        if arena_version != self.arena_version:
+            self.obstacles = [Obstacle(x / p, y / p) for x, y, _, _ in tables["obstacles"][1].tolist()]
+            self.arena_version = arena_version
+            self.area = left, top, right, bottom = tuple(area)
+            self.grid.resize(right - left, bottom - top, left, top)
+            self.grid.set_static(entity_boxes(self.obstacles))
+        targets = self.targets
+        self.grid.set_dynamic(np.column_stack((targets.x, targets.y, np.full((len(targets), 2), TARGET_SIZE))))
+
+    def obstacle_boxes_in(self, left, top, right, bottom):
+        """Boxes of the obstacles the server has in play, for drawing"""
+        return entity_boxes(self.obstacles)
+
+class GameClient(asyncio.DatagramProtocol):
+    """
+    Talks to the server: sends one input per tick (with the few before it, in case a packet
+    is lost) and decodes snapshots into world. Every input packet also says which snapshot
+    arrived last, which the server uses as the baseline of the next one.
+    While this client has a player, its inputs are also applied to world straight away and
+    checked against every snapshot (see prediction.py)
+    """
+    def __init__(self):
+        self.world = ClientWorld()
+        self.snapshots = {}        # Tick -> decoded tables of the last HISTORY snapshots
+        self.tick = None           # Tick of the newest snapshot, None until the first arrives
+        self.received_at = 0.0     # When it arrived (time.monotonic)
+        self.player_id = net.NO_PLAYER  # Id of this client's player, NO_PLAYER while it watches
+        self.input_ack = 0         # Newest input the server had applied at that snapshot
+        self.sequence = 0          # Sequence number of the last input sent
+        self.recent = deque(maxlen=net.INPUT_REDUNDANCY)  # Packed inputs of the last few ticks
+        self.prediction = Prediction()
+        self.snapshots_received = 0
+        self.bytes_received = 0
+        self.full_snapshots = 0    # Snapshots sent whole rather than as differences
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.sendto(bytes([net.HELLO]))
+
+    def datagram_received(self, data, address):
+        if len(data) < net.SNAPSHOT_HEADER.size or data[0] != net.SNAPSHOT:
+            return
+        _, tick, baseline, input_ack, player_id = net.SNAPSHOT_HEADER.unpack_from(data)
+        if self.tick is not None and tick <= self.tick:
+            return  # Arrived out of order; a newer one is already here
+        if baseline != net.NO_BASELINE and baseline not in self.snapshots:
+            return  # Can't be decoded; the server sends a whole one once it notices
+        tables = net.decode(data[net.SNAPSHOT_HEADER.size:], self.snapshots.get(baseline))
+        self.snapshots[tick] = tables
+        self.snapshots.pop(tick - net.HISTORY * net.SNAPSHOT_INTERVAL, None)
+        self.tick = tick
+        self.received_at = time.monotonic()
+        previous_id = self.player_id
+        self.player_id = player_id
+        self.input_ack = input_ack
+        self.snapshots_received += 1
+        self.bytes_received += len(data)
+        self.full_snapshots += baseline == net.NO_BASELINE
+        player = self.world.player
+        predicted = (player.prev_x, player.prev_y, player.x, player.y)
+        self.world.apply(tables, player_id)
+        if player_id != net.NO_PLAYER and player_id == previous_id:
+            self.prediction.reconcile(self.world, input_ack, predicted)
+        else:
+            self.prediction.clear()
+
+    def send_input(self, inputs):
+        """Send one tick's input, and apply it locally if this client has a player"""
+        self.sequence += 1
+        self.recent.append(pack_input(inputs))
+        acked = net.NO_BASELINE if self.tick is None else self.tick
+        header = net.INPUT_HEADER.pack(net.INPUT, self.sequence, acked, len(self.recent))
+        self.transport.sendto(header + b"".join(self.recent))
+        if self.player_id != net.NO_PLAYER:
+            # Predicted from the input exactly as the server will get it back from the packet
+            self.prediction.apply(self.world, self.sequence, unpack_input(*RECORD.unpack(self.recent[-1])))
+
+    def alpha(self):
+        """How far drawing should be from the previous snapshot to the newest one (0-1)"""
+        return min(1.0, (time.monotonic() - self.received_at) / (net.SNAPSHOT_INTERVAL * TICK))
+
+    def close(self):
+        """Tell the server this client is leaving"""
+        self.transport.sendto(bytes([net.BYE]))
+        self.transport.close()
+
+async def connect(host, port):
+    """Open a GameClient talking to the server at host, port"""
+    loop = asyncio.get_running_loop()
+    _, client = await loop.create_datagram_endpoint(GameClient, remote_addr=(host, port))
+    return client
+
+async def play(client, fps):
+    """Play in a window until it is closed"""
+    # Drawing is shared with the local game
+    from rendering import Camera, Renderer, SpriteBatch, TextCache
+    pygame.init()
+    screen = pygame.display.set_mode((ARENA_WIDTH, ARENA_HEIGHT), pygame.RESIZABLE)
+    pygame.display.set_caption("2D Paintball Shooter (network)")
+    font = pygame.font.Font(None, 64)
+    small_font = pygame.font.Font(None, 32)
+    score_font = pygame.font.Font(None, 36)
+    renderer = Renderer()
+    sprites = SpriteBatch()
+    text_cache = TextCache()
+    camera = Camera()
+
+    loop = asyncio.get_running_loop()
+    last_frame = loop.time()
+    accumulator = 0.0
+    weapon = None
+    restart = False
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    restart = True
+                elif pygame.K_1 <= event.key < pygame.K_1 + min(len(WEAPONS), 9):
+                    weapon = event.key - pygame.K_1
+            elif event.type == pygame.VIDEORESIZE:
+                screen = pygame.display.set_mode(event.size, pygame.RESIZABLE)
+
+        # One input per tick, like the local game
+        now = loop.time()
+        accumulator += min(now - last_frame, MAX_FRAME_TIME)
+        last_frame = now
+        keys = pygame.key.get_pressed()
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        while accumulator >= TICK:
+            client.send_input(PlayerInput(up=keys[pygame.K_w], down=keys[pygame.K_s],
+                                          left=keys[pygame.K_a], right=keys[pygame.K_d],
+                                          fire=pygame.mouse.get_pressed()[0],
+                                          aim_x=mouse_x + camera.x, aim_y=mouse_y + camera.y,
+                                          weapon=weapon, restart=restart))
+            accumulator -= TICK
+            weapon = None
+            restart = False
+
+        world = client.world
+        width, height = screen.get_size()
+        if client.tick is None or world.game_over:
+            screen.fill(WHITE)
+            lines = ([(font, "Connecting...", BLACK)] if client.tick is None else
+                     [(font, "GAME OVER", RED), (small_font, f"Final Score: {world.player.score}", BLACK),
+                      (small_font, "Press SPACE to restart", BLACK)])
+            for i, (line_font, text, color) in enumerate(lines):
+                surface = text_cache.render(line_font, text, color)
+                screen.blit(surface, surface.get_rect(center=(width / 2, height / 2 - 50 + 50 * i)))
+            pygame.display.flip()
+            renderer.invalidate()
+        else:
+            alpha = client.alpha()
+            prediction = client.prediction
+            # A predicted player moves every tick, so it is drawn between ticks as in the local game
+            playing = client.player_id != net.NO_PLAYER
+            player_alpha = accumulator / TICK if playing else alpha
+            camera.follow(world.player, player_alpha, world.width, world.height, width, height)
+            renderer.begin_frame(screen, world, camera)
+            renderer.add(sprites.draw_medkits(screen, world.medkits, camera.offset))
+            for player in world.players.values():
+                if player is not world.player and player.health > 0:
+                    renderer.add(player.draw(screen, alpha, camera.offset))
+            renderer.add(world.player.draw(screen, player_alpha, (camera.x - prediction.correction_x,
+                                                                  camera.y - prediction.correction_y)))
+            renderer.add(sprites.draw_targets(screen, world.targets, alpha, camera.offset))
+            renderer.add(sprites.draw_projectiles(screen, world.projectiles, PROJECTILE_COLORS, alpha,
+                                                  camera.offset))
+            renderer.add(sprites.draw_projectiles(screen, prediction.shots, PROJECTILE_COLORS, player_alpha,
+                                                  camera.offset))
+            hud = [f"Score: {world.player.score}", f"Wave: {world.wave}"]
+            if not playing:
+                hud.append("Watching")
+            for i, text in enumerate(hud):
+                surface = text_cache.render(score_font, text, BLACK)
+                renderer.add(screen.blit(surface, surface.get_rect(topright=(width - 10, 10 + 30 * i))))
+            if world.grace_period:
+                surface = text_cache.render(font, f"Grace Period: {int(world.grace_left)}s", BLACK)
+                renderer.add(screen.blit(surface, surface.get_rect(center=(width / 2, 50))))
+            renderer.end_frame()
+
+        await asyncio.sleep(max(0.0, 1 / fps - (loop.time() - now)))
+    pygame.quit()
+
+async def run_bot(client, seconds):
+    """Let PlayerBot play for seconds of real time, then report what the snapshots cost"""
+    bot = PlayerBot()
+    loop = asyncio.get_running_loop()
+    start = next_tick = loop.time()
+    while loop.time() - start < seconds:
+        inputs = bot.inputs(client.world) if client.tick is not None else PlayerInput()
+        inputs.restart = client.world.game_over  # Play again straight away
+        client.send_input(inputs)
+        next_tick += TICK
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    received = client.snapshots_received
+    whole = len(net.encode(client.snapshots[client.tick])) if client.tick is not None else 0
+    print(f"{received} snapshots, {client.full_snapshots} sent whole, "
+          f"{client.bytes_received / max(1, received):.0f} bytes each on average "
+          f"({whole} bytes for the last one sent whole), "
+          f"{client.bytes_received / seconds / 1024:.1f} KiB/s; "
+          f"score {client.world.player.score}, wave {client.world.wave}"
+          f"{'' if client.player_id != net.NO_PLAYER else ' (watching)'}")
+    prediction = client.prediction
+    if prediction.reconciled:
+        print(f"Prediction: {prediction.mispredictions} of {prediction.reconciled} snapshots corrected "
+              f"the player by a pixel or more (worst {prediction.worst_correction:.1f}px), "
+              f"{len(prediction.pending)} inputs unconfirmed at the end")
+
+async def main(args):
+    transports = []
+    port = args.port
+    if args.local:
+        # A server in this process, for trying network play on one machine
+        from server import start_server
+        from world import GameWorld
+        transport, server = await start_server(GameWorld(seed=args.seed), args.host, args.port)
+        transports.append(transport)
+        server_task = asyncio.ensure_future(server.run())
+    if args.lag is not None:
+        # Go through a proxy that holds every packet back, as a slow connection would
+        from lag_proxy import start_proxy
+        transport, _ = await start_proxy((args.host, args.port), args.lag / 1000, args.jitter / 1000,
+                                         host=args.host, port=args.port + 1)
+        transports.append(transport)
+        port = args.port + 1
+    clients = [await connect(args.host, port) for _ in range(args.clients)]
+    try:
+        if args.bot:
+            await asyncio.gather(*(run_bot(client, args.bot) for client in clients))
+        else:
+            await play(clients[0], args.fps)
+    finally:
+        for client in clients:
+            client.close()
+        if args.local:
+            server_task.cancel()
+        for transport in transports:
+            transport.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play on a game server started with server.py")
+    parser.add_argument("--host", default="127.0.0.1", help="server address")
+    parser.add_argument("--port", type=int, default=net.DEFAULT_PORT, help="server UDP port")
+    parser.add_argument("--fps", type=int, default=TICK_RATE, help="frames drawn per second")
+    parser.add_argument("--bot", type=float, default=None, metavar="SECONDS",
+                        help="let a scripted bot play for this long without a window and print traffic figures")
+    parser.add_argument("--clients", type=int, default=1, metavar="N",
+                        help="with --bot, connect this many bot clients, each playing its own player")
+    parser.add_argument("--local", action="store_true", help="start a server in this process too")
+    parser.add_argument("--seed", type=int, default=None, help="arena seed of the --local server")
+    parser.add_argument("--lag", type=float, default=None, metavar="MS",
+                        help="add this much round trip time through a proxy on the next port up")
+    parser.add_argument("--jitter", type=float, default=0, metavar="MS",
+                        help="with --lag, vary every packet's delay by up to this much")
+    args = parser.parse_args()
+    if args.clients > 1 and not args.bot:
+        parser.error("--clients needs --bot")
+    asyncio.run(main(args))
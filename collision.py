@@ -0,0 +1,70 @@
+import numpy as np
+
+def swept_hit_times(x0, y0, x1, y1, radius, boxes):
+    """
+    Batched swept test of moving squares against boxes
+    Each row is one (segment, box) pair: a square of half-size radius travelling from (x0, y0)
+    to (x1, y1) against a box (x, y, width, height). Returns the fraction 0-1 of the segment
+    at which the square first touches the box, or infinity for pairs that never touch.
+    The arguments may also be arrays of any shape that broadcast against each other
+    (with boxes carrying a trailing axis of 4), e.g. every segment against every box
+    """
+    # Growing the box by the radius lets us sweep a point instead of a square (slab method)
+    left = boxes[..., 0] - radius
+    top = boxes[..., 1] - radius
+    right = boxes[..., 0] + boxes[..., 2] + radius
+    bottom = boxes[..., 1] + boxes[..., 3] + radius
+    dx = x1 - x0
+    dy = y1 - y0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Times at which the point crosses each pair of box edges
+        tx_a = (left - x0) / dx
+        tx_b = (right - x0) / dx
+        ty_a = (top - y0) / dy
+        ty_b = (bottom - y0) / dy
+
+    # A segment parallel to an axis either stays inside that slab the whole time or never enters it
+    inside_x = (left < x0) & (x0 < right)
+    inside_y = (top < y0) & (y0 < bottom)
+    tx_enter = np.where(dx != 0, np.minimum(tx_a, tx_b), np.where(inside_x, -np.inf, np.inf))
+    tx_exit = np.where(dx != 0, np.maximum(tx_a, tx_b), np.where(inside_x, np.inf, -np.inf))
+    ty_enter = np.where(dy != 0, np.minimum(ty_a, ty_b), np.where(inside_y, -np.inf, np.inf))
+    ty_exit = np.where(dy != 0, np.maximum(ty_a, ty_b), np.where(inside_y, np.inf, -np.inf))
+
+    enter = np.maximum(tx_enter, ty_enter)
+    leave = np.minimum(tx_exit, ty_exit)
+    # Strict comparison keeps the colliderect rule that touching edges are not a hit
+    hit = (enter < leave) & (leave > 0) & (enter <= 1)
+    return np.where(hit, np.maximum(enter, 0), np.inf)
+
+def earliest_hits(x0, y0, x1, y1, radius, grid, layer):
+    """
+    For every moving square (arrays of start, end and radius) find the first item in the
+    grid layer it touches along its path
+    Returns (item index or -1, fraction of the path travelled before the hit or infinity)
+    """
+    count = len(x0)
+    first_item = np.full(count, -1, dtype=np.intp)
+    first_time = np.full(count, np.inf)
+
+    # Broad phase: only items overlapping the box around each whole path are candidates
+    sweep_boxes = np.column_stack((np.minimum(x0, x1) - radius, np.minimum(y0, y1) - radius,
+                                   np.abs(x1 - x0) + radius * 2, np.abs(y1 - y0) + radius * 2))
+    q, item = grid.query_pairs(sweep_boxes, layer)
+    if not len(q):
+        return first_item, first_time
+
+    # Narrow phase on the candidate pairs
+    t = swept_hit_times(x0[q], y0[q], x1[q], y1[q], radius[q], grid.layers[layer][0][item])
+    touched = np.isfinite(t)
+    q, item, t = q[touched], item[touched], t[touched]
+
+    # Keep the smallest time per segment: sort by (segment, time) and take each segment's first row
+    order = np.lexsort((t, q))
+    q, item, t = q[order], item[order], t[order]
+    first = np.ones(len(q), dtype=bool)
+    first[1:] = q[1:] != q[:-1]
+    first_item[q[first]] = item[first]
+    first_time[q[first]] = t[first]
+    return first_item, first_time
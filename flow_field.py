@@ -0,0 +1,129 @@
+import heapq
+import math
+import numpy as np
+
+# Steps to the 8 neighbouring cells as (row, column, cost); diagonal steps are longer
+STEPS = ((-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+         (-1, -1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (1, 1, math.sqrt(2)))
+STEP_COSTS = tuple(cost for _, _, cost in STEPS)
+
+SEARCH_BUDGET = 400  # Cells a search may take from its queue per update, so no single tick pays for all of it
+
+class FlowField:
+    """
+    Shortest routes around the obstacles from anywhere in the arena to the nearest of a few
+    goals (the players). The arena is divided into cells, and a cell is open if a mover of
+    mover_size centered in it touches no obstacle. One Dijkstra search outwards from the goals'
+    cells gives every cell the next cell on its shortest route to the nearest goal, so any
+    number of movers look up where to head in O(1) each. A search only runs when a goal
+    enters another cell, and it is spread over several updates, so its cost neither depends
+    on how many movers there are nor lands on a single tick. The field covers width x height
+    pixels from left, top
+    """
+    def __init__(self, width, height, mover_size, cell_size=30):
+        self.mover_size = mover_size   # Side of the square movers that follow the field
+        self.cell_size = cell_size     # Side length of one cell in pixels
+        self.resize(width, height)
+
+    def resize(self, width, height, left=0, top=0, obstacles=()):
+        """Cover a new area, holding the obstacle boxes obstacles"""
+        self.left = left               # World position of the field's top-left corner
+        self.top = top
+        self.cols = max(1, math.ceil(width / self.cell_size))
+        self.rows = max(1, math.ceil(height / self.cell_size))
+        cells = np.arange(self.rows * self.cols)
+        self.center_x = left + (cells % self.cols + 0.5) * self.cell_size   # Center of every cell
+        self.center_y = top + (cells // self.cols + 0.5) * self.cell_size
+        self.set_obstacles(obstacles)
+
+    def set_obstacles(self, boxes):
+        """Find the open cells given the obstacle boxes (rows of x, y, width, height)"""
+        n = self.rows * self.cols
+        half = self.mover_size / 2
+        size = self.cell_size
+        blocked = np.zeros((self.rows, self.cols), dtype=bool)
+        for x, y, w, h in np.asarray(boxes, dtype=float).reshape(-1, 4).tolist():
+            # Cells whose centers are less than half a mover from the box
+            c0 = max(0, math.floor((x - half - self.left) / size - 0.5) + 1)
+            r0 = max(0, math.floor((y - half - self.top) / size - 0.5) + 1)
+            c1 = min(self.cols, math.ceil((x + w + half - self.left) / size - 0.5))
+            r1 = min(self.rows, math.ceil((y + h + half - self.top) / size - 0.5))
+            if c1 > c0 and r1 > r0:
+                blocked[r0:r1, c0:c1] = True
+        is_open = np.append(~blocked.ravel(), False)  # The extra entry stands for "no cell"
+
+        # The neighbour each of the 8 steps leads to from every cell, or n where there is none.
+        # A mover may step out of a blocked cell (it can end up off the cell centers), but a
+        # diagonal step must not cut the corner of a blocked cell
+        row, col = np.divmod(np.arange(n), self.cols)
+        neighbours = np.empty((n, len(STEPS)), dtype=np.intp)
+        for k, (step_row, step_col, _) in enumerate(STEPS):
+            r, c = row + step_row, col + step_col
+            inside = (r >= 0) & (r < self.rows) & (c >= 0) & (c < self.cols)
+            if step_row and step_col:
+                inside &= (is_open[np.where(inside, r * self.cols + col, n)] &
+                           is_open[np.where(inside, row * self.cols + c, n)])
+            neighbours[:, k] = np.where(inside, r * self.cols + c, n)
+        # Plain lists, as the search walks them one cell at a time; the neighbours are flattened
+        # (cell k's are entries 8k to 8k + 7) so no list is made per cell
+        self.open = is_open.tolist()
+        self.neighbours = neighbours.ravel().tolist()
+
+        self.goal = ()        # Goal cells of the current routes (sorted); none until the first search is done
+        self.next_cell = np.full(n, -1, dtype=np.intp)
+        self.search = None    # Search in progress: goal cells, queue, distances and next cells
+
+    def update(self, goal_x, goal_y, budget=SEARCH_BUDGET):
+        """
+        Bring the routes up to date with the goals at goal_x, goal_y (numbers for one goal,
+        arrays for several), doing at most budget cells of search. Until a search finishes,
+        movers follow the routes to the goals' previous cells (or, before the first search
+        after set_obstacles, head straight for their goal)
+        """
+        if self.search is None:
+            goal = tuple(sorted(set(np.atleast_1d(self.cell_at(goal_x, goal_y)).tolist())))
+            if goal == self.goal:
+                return
+            n = self.rows * self.cols
+            distance = [math.inf] * n + [-math.inf]   # "No cell" can never be improved on
+            for cell in goal:
+                distance[cell] = 0.0
+            self.search = (goal, [(0.0, cell) for cell in goal], distance, [-1] * n)
+
+        # Dijkstra outwards from the goals. Routes only pass through open cells (and the goals'
+        # own cells, which may be too tight for a mover when a goal is next to an obstacle)
+        goal, queue, distance, next_cell = self.search
+        goal_cells = set(goal)
+        is_open, neighbours = self.open, self.neighbours
+        steps = len(STEPS)
+        while queue and budget > 0:
+            budget -= 1
+            d, cell = heapq.heappop(queue)
+            if d > distance[cell] or not (is_open[cell] or cell in goal_cells):
+                continue
+            for neighbour, cost in zip(neighbours[cell * steps:(cell + 1) * steps], STEP_COSTS):
+                if d + cost < distance[neighbour]:
+                    distance[neighbour] = d + cost
+                    next_cell[neighbour] = cell
+                    heapq.heappush(queue, (d + cost, neighbour))
+        if not queue:
+            self.goal = goal
+            self.next_cell = np.array(next_cell, dtype=np.intp)
+            self.search = None
+
+    def cell_at(self, x, y):
+        """Indices of the cells holding points x, y (points outside the field use the border cells)"""
+        col = np.clip(((np.asarray(x) - self.left) // self.cell_size).astype(np.intp), 0, self.cols - 1)
+        row = np.clip(((np.asarray(y) - self.top) // self.cell_size).astype(np.intp), 0, self.rows - 1)
+        return row * self.cols + col
+
+    def steer(self, x, y, goal_x, goal_y):
+        """
+        Points movers at x, y (arrays) should head for next on their way to goal_x, goal_y
+        (each mover's nearest goal). Movers in a goal's cell, next to it or with no route
+        head straight for their goal
+        """
+        next_cell = self.next_cell[self.cell_at(x, y)]
+        follow = (next_cell >= 0) & ~np.isin(next_cell, self.goal)
+        return (np.where(follow, self.center_x[next_cell], goal_x),
+                np.where(follow, self.center_y[next_cell], goal_y))
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import random
+import net
+
+# UDP relay that delays (and optionally drops) packets between game clients and a server,
+# for trying network play on one machine under the lag of a real connection, e.g.
+#
+#   python server.py      python lag_proxy.py --rtt 150      python client.py --port 5556
+#
+# client.py --lag MS starts one in the same process instead.
+
+DEFAULT_PORT = net.DEFAULT_PORT + 1
+
+class Upstream(asyncio.DatagramProtocol):
+    """The proxy's socket to the server for one client, so the server tells clients apart"""
+    def __init__(self, proxy, address):
+        self.proxy = proxy
+        self.address = address             # The client this socket relays for
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        self.proxy.delay(self.reply, data)
+
+    def send(self, data):
+        """Pass a packet from the client on to the server"""
+        if self.transport:  # A packet sent before the socket opened is lost
+            self.transport.sendto(data)
+
+    def reply(self, data):
+        """Pass a packet from the server back to the client"""
+        self.proxy.transport.sendto(data, self.address)
+
+class LagProxy(asyncio.DatagramProtocol):
+    """
+    Relays packets between clients and the server at server_address after rtt / 2 seconds
+    each way, give or take up to jitter seconds, losing a loss fraction of them. Jitter
+    can make packets overtake each other, as on the internet
+    """
+    def __init__(self, server_address, rtt, jitter=0.0, loss=0.0, seed=None):
+        self.server_address = server_address
+        self.rtt = rtt
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.upstreams = {}                # Client address -> Upstream
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        upstream = self.upstreams.get(address)
+        if upstream is None:
+            upstream = self.upstreams[address] = Upstream(self, address)
+            loop = asyncio.get_running_loop()
+            loop.create_task(loop.create_datagram_endpoint(lambda: upstream,
+                                                           remote_addr=self.server_address))
+        self.delay(upstream.send, data)
+
+    def delay(self, send, data):
+        """Call send(data) once the packet's delay is up, unless it is lost"""
+        if self.rng.random() < self.loss:
+            return
+        wait = max(0.0, self.rtt / 2 + self.rng.uniform(-self.jitter, self.jitter))
+        asyncio.get_running_loop().call_later(wait, send, data)
+
+async def start_proxy(server_address, rtt, jitter=0.0, loss=0.0, host="127.0.0.1", port=DEFAULT_PORT):
+    """Open a LagProxy listening on host, port; returns its transport and the proxy"""
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(lambda: LagProxy(server_address, rtt, jitter, loss),
+                                               local_addr=(host, port))
+
+async def main(args):
+    host, port = args.server.rsplit(":", 1)
+    transport, _ = await start_proxy((host, int(port)), args.rtt / 1000, args.jitter / 1000, args.loss,
+                                     args.host, args.port)
+    print(f"Relaying {args.host}:{args.port} -> {args.server} with {args.rtt:g}ms round trip")
+    try:
+        await asyncio.Event().wait()  # Until interrupted
+    finally:
+        transport.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relay game traffic with simulated network lag")
+    parser.add_argument("--server", default=f"127.0.0.1:{net.DEFAULT_PORT}", help="server address:port")
+    parser.add_argument("--host", default="127.0.0.1", help="address clients connect to")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="UDP port clients connect to")
+    parser.add_argument("--rtt", type=float, default=100, help="round trip time to add, in milliseconds")
+    parser.add_argument("--jitter", type=float, default=0, help="random variation of each delay, in milliseconds")
+    parser.add_argument("--loss", type=float, default=0, help="fraction of packets to drop (0-1)")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,136 @@
+import struct
+import zlib
+import numpy as np
+from world import GRACE_PERIOD_DURATION
+
+# Network play: server.py steps the one authoritative world at the fixed tick rate, and
+# clients (client.py) send it their input and draw the snapshots it sends back, all over
+# UDP with asyncio on both ends. A snapshot is the world as a few tables of whole numbers
+# (positions in 1/8 px steps, angles in milliradians, health in tenths). Each one is sent
+# as the difference from the last snapshot the client said it has, so everything that did
+# not change is zeros, and then compressed. A client that has nothing yet gets it whole.
+# Every client gets a player of its own while there is room (see server.py); the snapshot
+# header says which row of the players table is that client's.
+
+DEFAULT_PORT = 5555
+SNAPSHOT_INTERVAL = 2    # Ticks between snapshots (60 a second)
+HISTORY = 64             # Snapshots both ends keep as possible baselines for the differences
+INPUT_REDUNDANCY = 4     # Ticks of input repeated in every input packet, in case one is lost
+CLIENT_TIMEOUT = 5       # Seconds of silence after which the server forgets a client
+POSITION_STEPS = 8       # Snapshot units per pixel
+ANGLE_STEPS = 1000       # Snapshot units per radian
+HEALTH_STEPS = 10        # Snapshot units per health point
+TIME_STEPS = 1000        # Snapshot units per second
+MAX_SINCE_SHOT = 60      # Cap in seconds on the time since a player's last shot, as it starts out infinite
+
+# Packet kinds (the first byte of every packet)
+HELLO = 1       # Client -> server: join the game
+INPUT = 2       # Client -> server: the latest ticks' input
+SNAPSHOT = 3    # Server -> client: the world
+BYE = 4         # Client -> server: leaving
+
+# kind, sequence number of the newest input, newest snapshot tick received, number of input
+# records that follow (replay.RECORD, oldest first, ending with the newest)
+INPUT_HEADER = struct.Struct("<BIIB")
+# kind, tick, tick of the baseline snapshot (NO_BASELINE if sent whole),
+# sequence number of the newest input applied for this client, id of the client's player
+# (NO_PLAYER while it watches); compressed tables follow
+SNAPSHOT_HEADER = struct.Struct("<BIIIi")
+NO_BASELINE = 0xFFFFFFFF
+NO_PLAYER = -1
+
+# Columns of every snapshot table; each row also has an id that stays the same from one
+# snapshot to the next (a pool slot, a list index or a player's id)
+TABLES = {
+    "world": ("time", "wave", "game_over", "grace_period", "grace_left", "width", "height",
+              "arena_version", "left", "top", "right", "bottom"),
+    "players": ("x", "y", "angle", "health", "weapon", "score", "since_shot"),
+    "targets": ("x", "y", "health", "max_health"),
+    "projectiles": ("x", "y", "owner", "radius"),
+    "medkits": ("x", "y"),
+    "obstacles": ("x", "y", "width", "height"),
+}
+
+def _table(ids, *columns):
+    """A snapshot table: int32 ids and an int32 array with one column per value, rounded"""
+    ids = np.asarray(ids, dtype=np.int32)
+    values = np.column_stack([np.broadcast_to(np.asarray(c, dtype=float), len(ids)) for c in columns])
+    return ids, np.round(values).astype(np.int32).reshape(len(ids), len(columns))
+
+def snapshot(world):
+    """The state of world as snapshot tables (name -> (ids, values))"""
+    p = POSITION_STEPS
+    players = sorted(world.players, key=lambda player: player.id)  # Ids in order, for match
+    grace_left = (max(0, GRACE_PERIOD_DURATION - (world.time - world.grace_period_start))
+                  if world.grace_period else 0)
+    targets = world.targets
+    live_targets = targets.live()
+    projectiles = world.projectiles
+    live_projectiles = projectiles.live()
+    medkits = world.medkits
+    obstacles = world.obstacles
+    return {
+        "world": _table([0], world.time * TIME_STEPS, world.wave, world.game_over, world.grace_period,
+                        grace_left * TIME_STEPS, world.width, world.height, world.arena_version, *world.area),
+        "players": _table([player.id for player in players], [player.x * p for player in players],
+                          [player.y * p for player in players],
+                          [player.angle * ANGLE_STEPS for player in players],
+                          [player.health * HEALTH_STEPS for player in players],
+                          [player.weapon for player in players], [player.score for player in players],
+                          [min(world.time - player.last_shot_time, MAX_SINCE_SHOT) * TIME_STEPS
+                           for player in players]),
+        "targets": _table(live_targets, targets.x[live_targets] * p, targets.y[live_targets] * p,
+                          targets.health[live_targets] * HEALTH_STEPS,
+                          targets.max_health[live_targets] * HEALTH_STEPS),
+        "projectiles": _table(live_projectiles, projectiles.x[live_projectiles] * p,
+                              projectiles.y[live_projectiles] * p, projectiles.owner[live_projectiles],
+                              projectiles.radius[live_projectiles]),
+        "medkits": _table(np.arange(len(medkits)), [m.x * p for m in medkits], [m.y * p for m in medkits]),
+        "obstacles": _table(np.arange(len(obstacles)), [o.x * p for o in obstacles],
+                            [o.y * p for o in obstacles], [o.width for o in obstacles],
+                            [o.height for o in obstacles]),
+    }
+
+def match(ids, base_ids):
+    """For every id (both arrays sorted), whether base_ids has it too and at which row"""
+    if not len(base_ids):
+        return np.zeros(len(ids), dtype=bool), np.zeros(len(ids), dtype=np.intp)
+    rows = np.minimum(np.searchsorted(base_ids, ids), len(base_ids) - 1)
+    return base_ids[rows] == ids, rows
+
+def encode(tables, baseline=None):
+    """Snapshot tables as bytes, as differences from the baseline tables if there are any"""
+    parts = []
+    for name, columns in TABLES.items():
+        ids, values = tables[name]
+        values = values.copy()
+        if baseline is not None:
+            # Rows the baseline has too are sent as the change since then
+            base_ids, base_values = baseline[name]
+            found, rows = match(ids, base_ids)
+            values[found] -= base_values[rows[found]]
+        # Ids as the step from the previous id, and the values column by column: both
+        # leave long runs of the same small numbers for zlib to squeeze
+        parts.append(struct.pack("<I", len(ids)))
+        parts.append(np.diff(ids, prepend=0).astype("<i4").tobytes())
+        parts.append(np.ascontiguousarray(values.T, dtype="<i4").tobytes())
+    return zlib.compress(b"".join(parts), 1)
+
+def decode(data, baseline=None):
+    """Snapshot tables from bytes made by encode with the same baseline"""
+    data = zlib.decompress(data)
+    tables = {}
+    offset = 0
+    for name, columns in TABLES.items():
+        (n,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        ids = np.cumsum(np.frombuffer(data, "<i4", n, offset)).astype(np.int32)
+        offset += 4 * n
+        values = np.frombuffer(data, "<i4", n * len(columns), offset).reshape(len(columns), n).T.copy()
+        offset += 4 * n * len(columns)
+        if baseline is not None:
+            base_ids, base_values = baseline[name]
+            found, rows = match(ids, base_ids)
+            values[found] += base_values[rows[found]]
+        tables[name] = ids, values
+    return tables
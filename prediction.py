@@ -0,0 +1,133 @@
+from collections import deque
+import numpy as np
+from collision import earliest_hits
+from projectiles import ProjectilePool, OWNER_PLAYER
+from spatial_grid import SpatialGrid
+from weapons import WEAPONS
+from world import TICK, PAINTBALL_RADIUS
+
+# Client-side prediction for network play. The server only applies an input once it has
+# arrived, and its result takes as long again to come back, so a client that just drew the
+# snapshots would answer every key press one round trip late. Instead a playing client
+# moves its own player (and fires its paintballs) the moment the input is made, with the
+# same Player code the server runs, and corrects itself whenever a snapshot arrives.
+
+PENDING_INPUTS = 256       # Inputs kept waiting for the server's word (2 seconds at 120 ticks/s)
+CORRECTION_DECAY = 0.85    # Part of a correction still drawn after each tick (about 1/10 left after 100ms)
+SNAP_DISTANCE = 100        # Corrections bigger than this (e.g. a restart) are drawn at once
+MISPREDICTION = 1          # Corrections of at least this many pixels count as mispredictions
+
+class Prediction:
+    """
+    Runs a client's own player ahead of the server
+    Every input applied locally also goes into a ring buffer until the server confirms it
+    has applied it (the input ack in each snapshot). A snapshot puts the player back where
+    the server had it and plays the inputs still unconfirmed over again through
+    Player.move, so sliding along obstacles and bumping into targets play out as they will
+    on the server. Where that disagrees with what was drawn, the difference is kept as a
+    correction that fades out over a few ticks instead of the player jumping.
+    Paintballs fired locally are drawn straight away too, until the snapshots include the
+    server's own
+    """
+    def __init__(self):
+        self.pending = deque(maxlen=PENDING_INPUTS)  # (sequence number, PlayerInput) not yet confirmed, oldest first
+        self.shots = ProjectilePool(16)    # Paintballs fired locally that the server hasn't confirmed
+        self.shot_inputs = {}              # Slot in shots -> sequence number of the input that fired it
+        self.rng = np.random.default_rng() # Spread of the local pellets (the server's random stream decides the real one)
+        self.correction_x = 0.0            # How far the drawn player is from the simulated one
+        self.correction_y = 0.0
+        self.reconciled = 0                # Snapshots the prediction was checked against
+        self.mispredictions = 0            # Snapshots that moved the predicted player a pixel or more
+        self.worst_correction = 0.0        # Furthest a snapshot moved it, in pixels
+
+    def clear(self):
+        """Forget everything predicted (this client stopped playing, or took over another player)"""
+        self.pending.clear()
+        self.shots.clear()
+        self.shot_inputs = {}
+        self.correction_x = self.correction_y = 0.0
+
+    def apply(self, world, sequence, inputs):
+        """Apply one tick's input to world (a ClientWorld) now, as the server will later"""
+        self.pending.append((sequence, inputs))
+        player = world.player
+        if self.run(world, inputs):
+            weapon = player.weapon
+            slots = self.shots.spawn_many(player.x + player.width // 2, player.y + player.height // 2,
+                                          player.calculate_shot_angles(self.rng),
+                                          WEAPONS.projectile_speed[weapon], WEAPONS.range[weapon],
+                                          PAINTBALL_RADIUS, OWNER_PLAYER, WEAPONS.damage[weapon])
+            self.shot_inputs.update(dict.fromkeys(slots.tolist(), sequence))
+        self.step_shots(world)
+        self.correction_x *= CORRECTION_DECAY
+        self.correction_y *= CORRECTION_DECAY
+
+    def run(self, world, inputs):
+        """
+        The player's part of GameWorld.step for one tick of input: returns whether it fired
+        """
+        if inputs.restart or world.game_over or world.player.health <= 0:
+            return False  # The server decides what happens next (a player who is down waits for the next round)
+        world.time += TICK
+        if world.grace_period:
+            world.grace_left -= TICK
+            world.grace_period = world.grace_left > 0
+        player = world.player
+        if inputs.weapon is not None:
+            player.weapon = inputs.weapon
+        player.prev_x = player.x
+        player.prev_y = player.y
+        player.move(inputs, world, TICK)
+        player.aim(inputs.aim_x, inputs.aim_y)
+        return not world.grace_period and inputs.fire and player.can_shoot(world.time)
+
+    def reconcile(self, world, input_ack, predicted):
+        """
+        After a snapshot put world's player where the server had it at input input_ack,
+        replay the inputs the server hadn't applied yet. predicted is the player's
+        (prev_x, prev_y, x, y) from before the snapshot
+        """
+        while self.pending and self.pending[0][0] <= input_ack:
+            self.pending.popleft()
+        # Confirmed paintballs are in the snapshots now
+        confirmed = [slot for slot, sequence in self.shot_inputs.items() if sequence <= input_ack]
+        for slot in confirmed:
+            del self.shot_inputs[slot]
+        self.shots.free(confirmed)
+
+        for _, inputs in self.pending:
+            self.run(world, inputs)
+
+        player = world.player
+        prev_x, prev_y, x, y = predicted
+        # Keep the last tick's movement, so the player is drawn moving through the correction
+        player.prev_x = player.x - (x - prev_x)
+        player.prev_y = player.y - (y - prev_y)
+        error_x = x - player.x
+        error_y = y - player.y
+        error = (error_x ** 2 + error_y ** 2) ** 0.5
+        self.reconciled += 1
+        self.mispredictions += error >= MISPREDICTION
+        self.worst_correction = max(self.worst_correction, error)
+        self.correction_x += error_x
+        self.correction_y += error_y
+        if abs(self.correction_x) > SNAP_DISTANCE or abs(self.correction_y) > SNAP_DISTANCE:
+            self.correction_x = self.correction_y = 0.0
+
+    def step_shots(self, world):
+        """Move the local paintballs one tick; they vanish on hitting an obstacle or a target"""
+        shots = self.shots
+        expired = shots.step(TICK, *world.area)
+        live = shots.live()
+        if len(live):
+            x0, y0, x1, y1 = shots.prev_x[live], shots.prev_y[live], shots.x[live], shots.y[live]
+            radius = shots.radius[live]
+            _, obstacle_time = earliest_hits(x0, y0, x1, y1, radius, world.grid, SpatialGrid.STATIC)
+            _, target_time = earliest_hits(x0, y0, x1, y1, radius, world.grid, SpatialGrid.DYNAMIC)
+            # One flag per live paintball, so one that hits and expires is only freed once
+            spent = np.minimum(obstacle_time, target_time) <= shots.path_limit(live)
+            spent[np.searchsorted(live, expired)] = True
+            expired = live[spent]
+        for slot in expired.tolist():
+            self.shot_inputs.pop(slot, None)
+        shots.free(expired)
@@ -0,0 +1,163 @@
+import csv
+import json
+import time
+import numpy as np
+import pygame
+
+# Parts of a frame that are timed, in the order they run. The simulation phases are
+# marked inside GameWorld.step (once per tick, summed over the ticks of a frame) and the
+# rest by the front end. Time between two marks is charged to the later one
+PHASES = ("input", "player", "targets", "projectiles", "hits", "medkits", "sound", "draw", "display")
+# Entity counts recorded with every frame
+COUNTS = ("num_targets", "num_projectiles", "num_medkits", "num_obstacles")
+
+class FrameProfiler:
+    """
+    Records how long each phase of a frame takes, for the last few seconds of frames
+    Every frame is one row of a ring buffer of NumPy arrays: the time spent in each phase,
+    the time until the next frame started, the total time spent working, and the
+    number of entities alive. Old rows are overwritten, so memory use never grows
+    """
+    def __init__(self, capacity=600):
+        self.capacity = capacity       # Frames kept (5 seconds at 120 FPS)
+        self.frames = 0                # Frames recorded so far, including overwritten ones
+        self.phase_times = np.zeros((capacity, len(PHASES)))     # Seconds per phase
+        self.frame_times = np.full(capacity, np.nan)             # Seconds from frame start to the next one
+        self.work_times = np.zeros(capacity)                     # Seconds from frame start to end
+        self.counts = np.zeros((capacity, len(COUNTS)), dtype=np.int32)
+        self.phase_index = {name: i for i, name in enumerate(PHASES)}
+        self._current = [0.0] * len(PHASES)   # Phase times of the frame in progress
+        self._frame_start = None
+        self._last_mark = 0.0
+
+    def begin_frame(self):
+        """Start timing a new frame"""
+        now = time.perf_counter()
+        if self.frames:
+            # The previous frame lasted until now, including any time spent waiting
+            self.frame_times[(self.frames - 1) % self.capacity] = now - self._frame_start
+        self._frame_start = now
+        self._last_mark = now
+        self._current = [0.0] * len(PHASES)
+
+    def mark(self, phase):
+        """Charge the time since the previous mark (or the frame start) to phase"""
+        now = time.perf_counter()
+        self._current[self.phase_index[phase]] += now - self._last_mark
+        self._last_mark = now
+
+    def end_frame(self, world):
+        """Store the finished frame along with how many entities world holds"""
+        row = self.frames % self.capacity
+        self.phase_times[row] = self._current
+        self.frame_times[row] = np.nan  # Known once the next frame begins
+        self.work_times[row] = time.perf_counter() - self._frame_start
+        self.counts[row] = (len(world.targets), len(world.projectiles),
+                            len(world.medkits), len(world.obstacles))
+        self.frames += 1
+
+    def _rows(self):
+        """Ring buffer rows in the order they were recorded, oldest first"""
+        n = min(self.frames, self.capacity)
+        return (np.arange(n) + self.frames - n) % self.capacity
+
+    def summary(self):
+        """FPS, frame and work time percentiles and per-phase averages over the recorded frames"""
+        rows = self._rows()
+        if not len(rows):
+            return None
+        frame_times = self.frame_times[rows]
+        known = frame_times[~np.isnan(frame_times)]
+        phase_times = self.phase_times[rows]
+        return {
+            "frames": len(rows),
+            "fps": 1 / known.mean() if len(known) and known.mean() > 0 else 0.0,
+            "frame_ms_p50": np.percentile(known, 50) * 1000 if len(known) else 0.0,
+            "frame_ms_p99": np.percentile(known, 99) * 1000 if len(known) else 0.0,
+            "work_ms_p50": np.percentile(self.work_times[rows], 50) * 1000,
+            "work_ms_p99": np.percentile(self.work_times[rows], 99) * 1000,
+            "phase_ms_mean": dict(zip(PHASES, (phase_times.mean(axis=0) * 1000).tolist())),
+            "phase_ms_p99": dict(zip(PHASES, (np.percentile(phase_times, 99, axis=0) * 1000).tolist())),
+            "counts": dict(zip(COUNTS, self.counts[rows[-1]].tolist())),
+        }
+
+    def records(self):
+        """One dict per recorded frame (times in milliseconds), oldest first"""
+        rows = self._rows()
+        first = self.frames - len(rows)
+        records = []
+        for i, row in enumerate(rows):
+            frame_time = self.frame_times[row]  # Not known yet for the newest frame
+            record = {"frame": first + i,
+                      "frame_ms": None if np.isnan(frame_time) else float(frame_time * 1000),
+                      "work_ms": float(self.work_times[row] * 1000)}
+            record.update(zip(PHASES, (self.phase_times[row] * 1000).tolist()))
+            record.update(zip(COUNTS, self.counts[row].tolist()))
+            records.append(record)
+        return records
+
+    def export(self, path):
+        """Write the recorded frames to path, as JSON if it ends in .json and CSV otherwise"""
+        records = self.records()
+        if path.lower().endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"phases": PHASES, "counts": COUNTS, "summary": self.summary(),
+                           "frames": records}, f, indent=1)
+        else:
+            fields = ["frame", "frame_ms", "work_ms", *PHASES, *COUNTS]
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(records)
+
+class ProfilerOverlay:
+    """
+    On-screen panel with FPS, frame time percentiles and the time taken by each phase
+    The text is only re-rendered every refresh seconds, so the panel itself costs
+    almost nothing on the frames in between
+    """
+    def __init__(self, profiler, font, refresh=0.5):
+        self.profiler = profiler
+        self.font = font
+        self.refresh = refresh
+        self.visible = False
+        self.surface = None
+        self.last_update = -refresh
+
+    def toggle(self):
+        """Show the panel if hidden, hide it if shown"""
+        self.visible = not self.visible
+        self.surface = None  # Show fresh numbers when it reappears
+
+    def _render(self):
+        """Draw the current summary onto a new panel surface"""
+        summary = self.profiler.summary()
+        if summary is None:
+            return None
+        lines = [f"FPS {summary['fps']:.0f}   frame p50 {summary['frame_ms_p50']:.2f} ms"
+                 f"  p99 {summary['frame_ms_p99']:.2f} ms",
+                 f"work p50 {summary['work_ms_p50']:.2f} ms  p99 {summary['work_ms_p99']:.2f} ms"]
+        for phase in PHASES:
+            lines.append(f"{phase:<12}{summary['phase_ms_mean'][phase]:7.3f} ms"
+                         f"  p99 {summary['phase_ms_p99'][phase]:7.3f}")
+        lines.append("  ".join(f"{name} {count}" for name, count in summary["counts"].items()))
+
+        rendered = [self.font.render(line, True, (0, 0, 0)) for line in lines]
+        line_height = self.font.get_linesize()
+        width = max(text.get_width() for text in rendered) + 12
+        panel = pygame.Surface((width, line_height * len(rendered) + 12)).convert()
+        panel.fill((220, 220, 220))
+        for i, text in enumerate(rendered):
+            panel.blit(text, (6, 6 + i * line_height))
+        return panel
+
+    def draw(self, screen, now):
+        """Draw the panel in the top-left corner if it is visible and return the area it covers"""
+        if not self.visible:
+            return []
+        if self.surface is None or now - self.last_update >= self.refresh:
+            self.surface = self._render()
+            self.last_update = now
+        if self.surface is None:
+            return []
+        return [screen.blit(self.surface, (10, 10))]
@@ -0,0 +1,144 @@
+import math
+import numpy as np
+
+# Who fired a projectile (stored in ProjectilePool.owner)
+OWNER_PLAYER = 0   # Paintballs shot by a player
+OWNER_TARGET = 1   # Bullets shot by targets
+NO_SHOOTER = -1    # ProjectilePool.shooter of bullets, which no player fired
+
+class ProjectilePool:
+    """
+    Structure-of-arrays storage for every projectile in flight
+    Each projectile lives in a slot of a set of NumPy arrays instead of being its own object,
+    so the whole pool moves in a single vectorized step. Dead slots go onto a free-list
+    and are reused by the next shot instead of being removed from a list
+    """
+    def __init__(self, capacity=256):
+        self.capacity = 0
+        self.free_slots = []           # Stack of unused slot indices
+        self.x = np.zeros(0)           # Current X positions
+        self.y = np.zeros(0)           # Current Y positions
+        self.prev_x = np.zeros(0)      # X positions before the last step (start of the last step's path)
+        self.prev_y = np.zeros(0)      # Y positions before the last step
+        self.vx = np.zeros(0)          # X velocity (pixels per second)
+        self.vy = np.zeros(0)          # Y velocity (pixels per second)
+        self.speed = np.zeros(0)       # Length of (vx, vy), kept so we never need sqrt per step
+        self.distance = np.zeros(0)    # How far each projectile has travelled
+        self.max_range = np.zeros(0)   # Distance at which each projectile is removed
+        self.radius = np.zeros(0)      # Size of each projectile
+        self.damage = np.zeros(0)      # Damage dealt on hit
+        self.owner = np.zeros(0, dtype=np.int8)      # OWNER_PLAYER or OWNER_TARGET
+        self.shooter = np.zeros(0, dtype=np.int32)   # Id of the player who fired a paintball (NO_SHOOTER for bullets)
+        self.active = np.zeros(0, dtype=bool)        # Whether the slot holds a live projectile
+        self.last_dt = 0               # Length of the last step in seconds
+        self._grow(capacity)
+
+    def _grow(self, new_capacity):
+        """Enlarge every array to new_capacity slots, keeping existing projectiles"""
+        extra = new_capacity - self.capacity
+        for name in ("x", "y", "prev_x", "prev_y", "vx", "vy", "speed",
+                     "distance", "max_range", "radius", "damage"):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(extra)]))
+        self.owner = np.concatenate([self.owner, np.zeros(extra, dtype=np.int8)])
+        self.shooter = np.concatenate([self.shooter, np.full(extra, NO_SHOOTER, dtype=np.int32)])
+        self.active = np.concatenate([self.active, np.zeros(extra, dtype=bool)])
+        # New slots are pushed highest-first so the lowest index is handed out next
+        self.free_slots.extend(range(new_capacity - 1, self.capacity - 1, -1))
+        self.capacity = new_capacity
+
+    def __len__(self):
+        """Number of live projectiles"""
+        return self.capacity - len(self.free_slots)
+
+    def spawn(self, x, y, angle, speed, max_range, radius, owner, damage, shooter=NO_SHOOTER):
+        """Start a new projectile travelling along angle and return its slot index"""
+        if not self.free_slots:
+            self._grow(self.capacity * 2)
+        i = self.free_slots.pop()
+
+        # Direction is resolved to a velocity once here, not every step
+        self.x[i] = x
+        self.y[i] = y
+        self.prev_x[i] = x
+        self.prev_y[i] = y
+        self.vx[i] = math.cos(angle) * speed
+        self.vy[i] = math.sin(angle) * speed
+        self.speed[i] = speed
+        self.distance[i] = 0
+        self.max_range[i] = max_range
+        self.radius[i] = radius
+        self.damage[i] = damage
+        self.owner[i] = owner
+        self.shooter[i] = shooter
+        self.active[i] = True
+        return i
+
+    def spawn_many(self, x, y, angle, speed, max_range, radius, owner, damage, shooter=NO_SHOOTER):
+        """Start a batch of projectiles at once (angle is an array, the rest arrays or shared values) and return their slots"""
+        count = len(angle)
+        while len(self.free_slots) < count:
+            self._grow(self.capacity * 2)
+        slots = np.array(self.free_slots[len(self.free_slots) - count:], dtype=np.intp)
+        del self.free_slots[len(self.free_slots) - count:]
+
+        self.x[slots] = self.prev_x[slots] = x
+        self.y[slots] = self.prev_y[slots] = y
+        self.vx[slots] = np.cos(angle) * speed
+        self.vy[slots] = np.sin(angle) * speed
+        self.speed[slots] = speed
+        self.distance[slots] = 0
+        self.max_range[slots] = max_range
+        self.radius[slots] = radius
+        self.damage[slots] = damage
+        self.owner[slots] = owner
+        self.shooter[slots] = shooter
+        self.active[slots] = True
+        return slots
+
+    def live(self):
+        """Indices of all live projectiles"""
+        return np.flatnonzero(self.active)
+
+    def free(self, indices):
+        """Return live slots to the free-list, each listed once"""
+        indices = np.asarray(indices, dtype=np.intp)
+        # A slot freed twice would be handed out to two projectiles at once
+        assert self.active[indices].all() and len(np.unique(indices)) == len(indices), \
+            "freeing a projectile slot that is not live, or the same slot twice"
+        self.active[indices] = False
+        self.free_slots.extend(indices.tolist())
+
+    def clear(self):
+        """Remove every projectile"""
+        self.free(self.live())
+
+    def step(self, dt, left, top, right, bottom):
+        """
+        Move every live projectile by dt seconds and return the slots that left the area
+        left, top - right, bottom or ran out of range. Those are not freed yet, because they
+        may still have hit something on the way
+        """
+        # Remember where this step's path starts for swept collision checks
+        np.copyto(self.prev_x, self.x)
+        np.copyto(self.prev_y, self.y)
+
+        # Free slots are moved too; that is cheaper than masking and their values are never read
+        self.x += self.vx * dt
+        self.y += self.vy * dt
+        self.distance += self.speed * dt
+        self.last_dt = dt
+
+        # Report projectiles that:
+        # 1. Leave the area in play (the arena, or the loaded chunks of a big map)
+        # 2. Exceed their maximum range
+        dead = self.active & ((self.x < left) | (self.x > right) |
+                              (self.y < top) | (self.y > bottom) |
+                              (self.distance >= self.max_range))
+        return np.flatnonzero(dead)
+
+    def path_limit(self, indices):
+        """Fraction of the last step's path that was still within range (0-1) for each slot"""
+        step_length = self.speed[indices] * self.last_dt
+        travelled_before = self.distance[indices] - step_length
+        return np.clip((self.max_range[indices] - travelled_before) / step_length, 0, 1)
+
@@ -0,0 +1,224 @@
+import pygame
+import numpy as np
+from collections import OrderedDict
+from itertools import repeat
+
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+PURPLE = (128, 0, 128)
+
+# Above this many changed areas per frame a single full-window update is cheaper
+MAX_DIRTY_RECTS = 400
+
+class Camera:
+    """
+    Which part of the map the window shows, as the world position of its top-left corner
+    The camera keeps the player centered but stops at the edges of the map, so an arena no
+    bigger than the window is shown whole from its corner and never scrolls
+    """
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+
+    def follow(self, player, alpha, map_width, map_height, view_width, view_height):
+        """Center a view_width x view_height view on the player, alpha of the way through the last tick"""
+        x = player.prev_x + (player.x - player.prev_x) * alpha + player.width / 2 - view_width / 2
+        y = player.prev_y + (player.y - player.prev_y) * alpha + player.height / 2 - view_height / 2
+        self.x = int(max(0, min(x, map_width - view_width)))
+        self.y = int(max(0, min(y, map_height - view_height)))
+
+    @property
+    def offset(self):
+        """(x, y) to subtract from world positions to get window positions"""
+        return self.x, self.y
+
+class Renderer:
+    """
+    Redraws only the parts of the window that change
+    The white background and the obstacles in view are drawn once onto a cached surface,
+    rebuilt only when the obstacles, the window size or the camera position change. Each
+    frame the areas covered by last frame's moving sprites are restored from that surface,
+    the sprites are drawn again, and only the old and new areas are pushed to the display
+    instead of filling and flipping the whole window. While the camera scrolls every frame
+    is a full redraw, but only the obstacles in view are drawn
+    """
+    def __init__(self):
+        self.screen = None             # Surface the last frame was drawn on
+        self.background = None         # Cached white background with obstacles
+        self.background_key = None     # (window size, world.arena_version, camera position) of the cache
+        self.previous_rects = []       # Areas drawn on in the last frame
+        self.rects = []                # Areas drawn on in this frame
+        self.full_redraw = True        # Whether the whole window must be redrawn this frame
+
+    def invalidate(self):
+        """Redraw the whole window next frame (e.g. after something else drew over it)"""
+        self.full_redraw = True
+
+    def _background_for(self, screen, world, camera):
+        """Return the cached background, rebuilding it if the window, obstacles or camera changed"""
+        key = (screen.get_size(), world.arena_version, camera.offset)
+        if key != self.background_key:
+            if self.background is None or self.background.get_size() != screen.get_size():
+                self.background = pygame.Surface(screen.get_size()).convert()
+            self.background.fill(WHITE)
+            width, height = screen.get_size()
+            boxes = world.obstacle_boxes_in(camera.x, camera.y, camera.x + width, camera.y + height)
+            for x, y, w, h in boxes.tolist():
+                pygame.draw.rect(self.background, PURPLE, (x - camera.x, y - camera.y, w, h))
+            self.background_key = key
+            self.full_redraw = True
+        return self.background
+
+    def begin_frame(self, screen, world, camera):
+        """Erase last frame's sprites by restoring the background under them"""
+        if screen is not self.screen:
+            # New display surface (resize or fullscreen toggle): nothing on it can be reused
+            self.screen = screen
+            self.full_redraw = True
+        background = self._background_for(screen, world, camera)
+        if self.full_redraw:
+            screen.blit(background, (0, 0))
+        else:
+            for rect in self.previous_rects:
+                screen.blit(background, rect, rect)
+        self.rects = []
+
+    def add(self, rects):
+        """Record areas drawn on this frame (a Rect or a list of Rects)"""
+        if isinstance(rects, pygame.Rect):
+            self.rects.append(rects)
+        else:
+            self.rects.extend(rects)
+
+    def end_frame(self):
+        """Push this frame's changes to the display"""
+        if self.full_redraw or len(self.rects) + len(self.previous_rects) > MAX_DIRTY_RECTS:
+            pygame.display.flip()
+        else:
+            # Old areas must be updated too, so sprites that moved away disappear
+            pygame.display.update(self.previous_rects + self.rects)
+        self.previous_rects = self.rects
+        self.full_redraw = False
+
+class TextCache:
+    """
+    Keeps rendered text surfaces so the same text is only rasterized once
+    Surfaces are keyed by (font, text, color); the least recently used ones are dropped
+    once the cache is full. HUD text like the score changes rarely, so almost every
+    frame is a cache hit instead of a call to Font.render
+    """
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()   # (font, text, color) -> Surface, oldest use first
+
+    def render(self, font, text, color):
+        """Return an antialiased surface of text, rendering it only if it isn't cached"""
+        key = (font, text, color)
+        surface = self.entries.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self.entries[key] = surface
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)  # Evict the least recently used text
+        else:
+            self.entries.move_to_end(key)
+        return surface
+
+# Key color for the transparent parts of sprites (never used by anything drawn)
+TRANSPARENT = (255, 0, 255)
+
+class SpriteBatch:
+    """
+    Draws many copies of the same small shapes with one Surface.blits call per layer
+    Each shape (a projectile circle, a target with its health bar, a medkit) is drawn once
+    onto a cached sprite, and every frame the sprite is stamped at all entity positions,
+    which come straight from the NumPy position arrays, instead of issuing pygame.draw calls
+    per entity. Positions are shifted by the camera offset and entities outside the window
+    are skipped. The draw methods return the screen areas they changed, for Renderer.add
+    """
+    def __init__(self):
+        self.sprites = {}              # Cached sprites by shape description
+
+    def _sprite(self, key, size, paint):
+        """Return the cached sprite for key, creating it with paint(surface) the first time"""
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface(size).convert()
+            sprite.fill(TRANSPARENT)
+            paint(sprite)
+            sprite.set_colorkey(TRANSPARENT, pygame.RLEACCEL)
+            self.sprites[key] = sprite
+        return sprite
+
+    def circle(self, color, radius):
+        """Sprite of a filled circle whose center is at (radius, radius)"""
+        return self._sprite(("circle", color, radius), (radius * 2, radius * 2),
+                            lambda s: pygame.draw.circle(s, color, (radius, radius), radius))
+
+    def draw_projectiles(self, screen, pool, colors, alpha=1, offset=(0, 0)):
+        """Draw every live projectile as a circle colored by owner, alpha of the way through the last step"""
+        live = pool.live()
+        x = (pool.prev_x[live] + (pool.x[live] - pool.prev_x[live]) * alpha - offset[0]).astype(int)
+        y = (pool.prev_y[live] + (pool.y[live] - pool.prev_y[live]) * alpha - offset[1]).astype(int)
+        radius = pool.radius[live].astype(int)
+        owner = pool.owner[live]
+        visible = _on_screen(screen, x - radius, y - radius, radius * 2, radius * 2)
+        x, y, radius, owner = x[visible], y[visible], radius[visible], owner[visible]
+
+        # One sprite per (owner, radius) group, all stamped in a single blits call
+        sequence = []
+        for group_owner, color in enumerate(colors):
+            in_owner = owner == group_owner
+            for r in np.unique(radius[in_owner]).tolist():
+                group = in_owner & (radius == r)
+                sprite = self.circle(color, r)
+                positions = zip((x[group] - r).tolist(), (y[group] - r).tolist())
+                sequence.extend(zip(repeat(sprite), positions))
+        return screen.blits(sequence, doreturn=True)
+
+    def draw_targets(self, screen, swarm, alpha=1, offset=(0, 0)):
+        """Draw every live target and its health bar, alpha of the way from the previous tick to this one"""
+        health_bar_width = 30
+        health_bar_height = 4
+        live = swarm.live()
+        x = (swarm.prev_x[live] + (swarm.x[live] - swarm.prev_x[live]) * alpha - offset[0]).astype(int)
+        y = (swarm.prev_y[live] + (swarm.y[live] - swarm.prev_y[live]) * alpha - offset[1]).astype(int)
+        visible = _on_screen(screen, x, y - 8, swarm.width, swarm.height + 8)
+        live, x, y = live[visible], x[visible], y[visible]
+
+        def paint_target(s):
+            # Red health bar background on top, 4px gap, red square body below
+            pygame.draw.rect(s, RED, (0, 0, health_bar_width, health_bar_height))
+            pygame.draw.rect(s, RED, (0, 8, swarm.width, swarm.height))
+        body = self._sprite(("target", swarm.width, swarm.height),
+                            (swarm.width, swarm.height + 8), paint_target)
+        fill = self._sprite(("health", health_bar_width, health_bar_height),
+                            (health_bar_width, health_bar_height), lambda s: s.fill(GREEN))
+
+        # Each target's body (with an empty health bar) is followed by the green part of its
+        # health bar, cut from the full bar sprite, so overlapping targets layer as before
+        health_percentage = np.maximum(0, swarm.health[live] / swarm.max_health[live])
+        fill_width = (health_bar_width * health_percentage).astype(int)
+        sequence = []
+        for left, top, width in zip(x.tolist(), (y - 8).tolist(), fill_width.tolist()):
+            sequence.append((body, (left, top)))
+            sequence.append((fill, (left, top), (0, 0, width, health_bar_height)))
+        # Every other rect is a body, which covers its health bar too
+        drawn = screen.blits(sequence, doreturn=True)[::2]
+        return drawn
+
+    def draw_medkits(self, screen, medkits, offset=(0, 0)):
+        """Draw every active medkit as a white square with a red cross"""
+        def paint_medkit(s):
+            s.fill(WHITE)
+            pygame.draw.rect(s, RED, (8, 2, 4, 16))  # Vertical
+            pygame.draw.rect(s, RED, (2, 8, 16, 4))  # Horizontal
+        sprite = self._sprite(("medkit",), (20, 20), paint_medkit)
+        return screen.blits([(sprite, (int(m.x) - offset[0], int(m.y) - offset[1]))
+                             for m in medkits if m.active], doreturn=True)
+
+def _on_screen(screen, x, y, width, height):
+    """Which boxes (arrays of window positions and sizes) overlap the window"""
+    screen_width, screen_height = screen.get_size()
+    return (x + width > 0) & (x < screen_width) & (y + height > 0) & (y < screen_height)
@@ -0,0 +1,168 @@
+import struct
+import time
+import zlib
+from world import GameWorld, PlayerInput, TICK, TICK_RATE
+from profiler import FrameProfiler
+from weapons import WEAPONS
+
+# A recording is everything needed to play a session again exactly: the world's seed and
+# starting size, then one small record per tick with that tick's input. The simulation
+# runs in fixed ticks and takes all its randomness from the seed, so feeding the same
+# inputs to a world with the same seed repeats the session tick for tick.
+
+MAGIC = b"SHRP"
+VERSION = 4
+# magic, version, tick rate, seed, arena width and height, targets, obstacles, chunked arena
+# (32-bit sizes, as big maps can be wider than 65535 pixels)
+HEADER = struct.Struct("<4sBHQIIHHB")
+# buttons, weapon (0 keeps it, otherwise 1 + its index in weapons.WEAPONS), aim x, aim y
+# (a resize record holds the new width and height instead, and a budget record the new
+# target and projectile caps). The aim is a map position, which on big maps passes 32767
+RECORD = struct.Struct("<BBii")
+
+# Bits of the buttons byte
+UP = 1
+DOWN = 2
+LEFT = 4
+RIGHT = 8
+FIRE = 16
+RESTART = 32
+
+RESIZE = 255                        # Weapon byte of a record that resizes the arena instead of a tick
+BUDGET = 254                        # Weapon byte of a record that changes the budget caps instead of a tick
+
+def pack_input(inputs):
+    """One tick's input as a RECORD (aim positions are stored as whole pixels)"""
+    buttons = ((UP if inputs.up else 0) | (DOWN if inputs.down else 0) |
+               (LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0) |
+               (FIRE if inputs.fire else 0) | (RESTART if inputs.restart else 0))
+    weapon = 0 if inputs.weapon is None else inputs.weapon + 1
+    return RECORD.pack(buttons, weapon, int(inputs.aim_x), int(inputs.aim_y))
+
+def unpack_input(buttons, weapon, x, y):
+    """
+    The PlayerInput stored in the fields of a tick RECORD
+    Raises ValueError for a weapon byte that names no weapon in WEAPONS, so a bad packet or
+    file is turned away before the world tries to use it
+    """
+    if weapon > len(WEAPONS):
+        raise ValueError(f"weapon byte {weapon} is not a weapon (there are {len(WEAPONS)})")
+    return PlayerInput(up=bool(buttons & UP), down=bool(buttons & DOWN),
+                       left=bool(buttons & LEFT), right=bool(buttons & RIGHT),
+                       fire=bool(buttons & FIRE), aim_x=x, aim_y=y,
+                       weapon=weapon - 1 if weapon else None, restart=bool(buttons & RESTART))
+
+class InputRecorder:
+    """
+    Collects the input of every tick a world is stepped with, to be saved as a recording
+    Create it right after the world, before the first step
+    """
+    def __init__(self, world):
+        self.header = HEADER.pack(MAGIC, VERSION, TICK_RATE, world.seed, world.width, world.height,
+                                  world.num_targets, world.num_obstacles, world.chunked)
+        self.records = bytearray()
+
+    def record(self, inputs):
+        """Add one tick's input (aim positions are stored as whole pixels)"""
+        self.records += pack_input(inputs)
+
+    def record_resize(self, width, height):
+        """Note that the arena was resized before the next tick"""
+        self.records += RECORD.pack(0, RESIZE, width, height)
+
+    def record_budget(self, max_targets, max_projectiles):
+        """Note that the budget governor changed the caps before the next tick"""
+        self.records += RECORD.pack(0, BUDGET, max_targets, max_projectiles)
+
+    def save(self, path):
+        """Write the recording to path; the tick records are compressed, as most ticks repeat the last"""
+        with open(path, "wb") as f:
+            f.write(self.header)
+            f.write(zlib.compress(bytes(self.records), 9))
+
+class Recording:
+    """A saved session: how to create its world and the inputs to step it with"""
+    def __init__(self, seed, width, height, num_targets, num_obstacles, records, chunked=False):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.num_targets = num_targets
+        self.num_obstacles = num_obstacles
+        self.chunked = chunked   # Whether the arena is a big map that scrolls
+        self.records = records   # Uncompressed tick and resize records
+
+    @classmethod
+    def load(cls, path):
+        """Read a recording saved by InputRecorder.save"""
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is not a recording")
+        magic, version, tick_rate = struct.unpack_from("<4sBH", data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a recording")
+        if version != VERSION or tick_rate != TICK_RATE:
+            raise ValueError(f"{path} was recorded by an incompatible version of the game "
+                             f"(format {version}, {tick_rate} ticks/s)")
+        _, _, _, seed, width, height, num_targets, num_obstacles, chunked = HEADER.unpack_from(data)
+        records = zlib.decompress(data[HEADER.size:])
+        for _, weapon, _, _ in RECORD.iter_unpack(records):
+            if len(WEAPONS) < weapon < BUDGET:
+                raise ValueError(f"{path} switches to weapon {weapon - 1}, but weapons.json lists "
+                                 f"only {len(WEAPONS)}")
+        return cls(seed, width, height, num_targets, num_obstacles, records, bool(chunked))
+
+    def __len__(self):
+        """Number of ticks recorded"""
+        return sum(1 for _, weapon, _, _ in RECORD.iter_unpack(self.records)
+                   if weapon not in (RESIZE, BUDGET))
+
+    def create_world(self):
+        """A new world in the same starting state as the recorded one"""
+        return GameWorld(self.width, self.height, self.num_targets, self.num_obstacles,
+                         seed=self.seed, chunked=self.chunked)
+
+    def inputs(self, world):
+        """
+        Yield the PlayerInput of every recorded tick in order
+        Recorded resizes and budget changes are applied to world as they come up, between the ticks
+        """
+        for buttons, weapon, x, y in RECORD.iter_unpack(self.records):
+            if weapon == RESIZE:
+                world.resize(x, y)
+                continue
+            if weapon == BUDGET:
+                world.set_budget(x, y)
+                continue
+            yield unpack_input(buttons, weapon, x, y)
+
+def replay(recording, profiler=None):
+    """Play a recording back without a window as fast as possible and return the final world"""
+    world = recording.create_world()
+    world.profiler = profiler
+    for inputs in recording.inputs(world):
+        if profiler:
+            profiler.begin_frame()
+        world.step(TICK, inputs)
+        if profiler:
+            profiler.end_frame(world)
+    return world
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay a recorded session without a window or sound")
+    parser.add_argument("recording", help="file written by shootergame.py --record")
+    parser.add_argument("--profile", default=None,
+                        help="write per-tick phase timings to this file (.json or .csv)")
+    args = parser.parse_args()
+
+    recording = Recording.load(args.recording)
+    ticks = len(recording)
+    profiler = FrameProfiler(capacity=max(1, ticks)) if args.profile else None
+    start = time.perf_counter()
+    world = replay(recording, profiler)
+    elapsed = time.perf_counter() - start
+    print(f"replayed {ticks} ticks ({ticks * TICK:.1f}s of play) in {elapsed:.3f}s, "
+          f"score {world.player.score}, health {world.player.health}")
+    if profiler:
+        profiler.export(args.profile)
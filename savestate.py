@@ -0,0 +1,263 @@
+import mmap
+import struct
+import numpy as np
+from world import GameWorld, Player, Obstacle, Medkit, entity_boxes, TICK_RATE
+from chunks import ChunkedObstacles
+from weapons import WEAPONS
+
+# A saved state is a whole world in one block of bytes: every single value (the player,
+# the wave, the random stream...) in one struct, then the entity arrays (targets, projectiles,
+# obstacles, medkits and the targets' routes) as raw NumPy buffers. Restoring one copies
+# those buffers back instead of generating anything, so restarting an arena, returning to a
+# checkpoint or starting a pre-built arena is about as fast as copying memory. A world
+# restored from a state plays on exactly as the saved one would have, given the same inputs.
+#
+#   python savestate.py arena.state --seed 7        write a pre-built arena
+#   python shootergame.py --arena arena.state       play it
+
+MAGIC = b"SHST"
+VERSION = 2
+# magic, version, tick rate, number of arrays that follow the world values
+HEADER = struct.Struct("<4sBHH")
+# Every single value of the world, in the order of WORLD_FIELDS
+WORLD = struct.Struct("<QiiHHB4idHdBdBii16s16sBI" "6d16sdIIII" "QH2dH" "iiBd")
+WORLD_FIELDS = (
+    # World
+    "seed", "width", "height", "num_targets", "num_obstacles", "chunked", "left", "top", "right", "bottom",
+    "time", "wave", "wave_start", "grace_period", "grace_period_start", "game_over",
+    "max_targets", "max_projectiles",
+    # Random stream (PCG64): 128-bit state and increment, and a buffered half of a draw
+    "rng_state", "rng_inc", "rng_has_uint32", "rng_uinteger",
+    # Player
+    "x", "y", "prev_x", "prev_y", "angle", "last_shot_time", "weapon", "health", "score",
+    "shots_fired", "shots_hit", "player_id",
+    # Big map (all zero in a normal arena)
+    "map_seed", "per_chunk", "keep_clear_x", "keep_clear_y", "chunk_size",
+    # Target routes and projectiles
+    "route_goal", "search_goal", "searching", "last_dt",
+)
+# name, NumPy type, number of items, offset from the start of the state
+ARRAY = struct.Struct("<32s4sQQ")
+NO_CAP = -1    # max_targets or max_projectiles of a world without budget caps
+
+TARGET_ARRAYS = ("x", "y", "prev_x", "prev_y", "speed", "health", "max_health", "last_shot_time",
+                 "next_shot_delay", "max_shot_delay", "shooting_range", "max_angle_variance", "alive")
+PROJECTILE_ARRAYS = ("x", "y", "prev_x", "prev_y", "vx", "vy", "speed", "distance", "max_range",
+                     "radius", "damage", "owner", "shooter", "active")
+
+def save(world):
+    """The whole state of world as bytes (of a world with one player; network games aren't saved)"""
+    if len(world.players) > 1:
+        raise ValueError(f"can't save a world with {len(world.players)} players")
+    player = world.player
+    chunks = world.chunks
+    flow_field = world.flow_field
+    search = flow_field.search
+    state = world.rng.bit_generator.state
+    if state["bit_generator"] != "PCG64":
+        raise ValueError(f"can't save a {state['bit_generator']} random stream")
+    values = {
+        "seed": world.seed, "width": world.width, "height": world.height,
+        "num_targets": world.num_targets, "num_obstacles": world.num_obstacles, "chunked": world.chunked,
+        "time": world.time, "wave": world.wave,
+        "wave_start": world.wave_start, "grace_period": world.grace_period,
+        "grace_period_start": world.grace_period_start, "game_over": world.game_over,
+        "max_targets": NO_CAP if world.max_targets is None else world.max_targets,
+        "max_projectiles": NO_CAP if world.max_projectiles is None else world.max_projectiles,
+        "rng_state": state["state"]["state"].to_bytes(16, "little"),
+        "rng_inc": state["state"]["inc"].to_bytes(16, "little"),
+        "rng_has_uint32": state["has_uint32"], "rng_uinteger": state["uinteger"],
+        "x": player.x, "y": player.y, "prev_x": player.prev_x, "prev_y": player.prev_y,
+        "angle": player.angle, "last_shot_time": player.last_shot_time,
+        "weapon": WEAPONS.names[player.weapon].encode(), "health": player.health, "score": player.score,
+        "shots_fired": player.shots_fired, "shots_hit": player.shots_hit, "player_id": player.id,
+        "map_seed": chunks.seed if chunks else 0, "per_chunk": chunks.per_chunk if chunks else 0,
+        "keep_clear_x": chunks.keep_clear[0] if chunks else 0,
+        "keep_clear_y": chunks.keep_clear[1] if chunks else 0,
+        "chunk_size": chunks.chunk_size if chunks else 0,
+        # With one player there is at most one goal cell; -1 for none
+        "route_goal": flow_field.goal[0] if flow_field.goal else -1,
+        "search_goal": search[0][0] if search else -1,
+        "searching": search is not None, "last_dt": world.projectiles.last_dt,
+    }
+    values["left"], values["top"], values["right"], values["bottom"] = world.area
+
+    targets = world.targets
+    projectiles = world.projectiles
+    obstacles = entity_boxes(world.obstacles)
+    medkits = entity_boxes(world.medkits)
+    arrays = {"obstacle_x": obstacles[:, 0], "obstacle_y": obstacles[:, 1],
+              "medkit_x": medkits[:, 0], "medkit_y": medkits[:, 1],
+              "target_free": np.array(targets.free_slots, dtype=np.int64),
+              "projectile_free": np.array(projectiles.free_slots, dtype=np.int64),
+              "route_next": flow_field.next_cell.astype(np.int64)}
+    arrays.update((f"target_{name}", getattr(targets, name)) for name in TARGET_ARRAYS)
+    arrays.update((f"shot_{name}", getattr(projectiles, name)) for name in PROJECTILE_ARRAYS)
+    if search:
+        # A route search spread over several ticks is halfway done; it carries on after restoring
+        _, queue, distance, next_cell = search
+        arrays["search_queue_d"] = np.array([d for d, _ in queue], dtype=float)
+        arrays["search_queue_cell"] = np.array([cell for _, cell in queue], dtype=np.int64)
+        arrays["search_distance"] = np.array(distance, dtype=float)
+        arrays["search_next"] = np.array(next_cell, dtype=np.int64)
+
+    # Arrays start on 8-byte boundaries, so they can be read straight out of a mapped file
+    offset = HEADER.size + WORLD.size + ARRAY.size * len(arrays)
+    index = []
+    for name, a in arrays.items():
+        offset += -offset % 8
+        index.append(ARRAY.pack(name.encode(), a.dtype.str.encode(), len(a), offset))
+        offset += a.nbytes
+    data = bytearray(offset)
+    data[:HEADER.size] = HEADER.pack(MAGIC, VERSION, TICK_RATE, len(arrays))
+    WORLD.pack_into(data, HEADER.size, *(values[name] for name in WORLD_FIELDS))
+    data[HEADER.size + WORLD.size:HEADER.size + WORLD.size + ARRAY.size * len(arrays)] = b"".join(index)
+    for entry, a in zip(index, arrays.values()):
+        _, _, _, start = ARRAY.unpack(entry)
+        data[start:start + a.nbytes] = a.tobytes()
+    return bytes(data)
+
+def read_state(data):
+    """The world values (a dict) and arrays (name -> read-only NumPy view of data) of a saved state"""
+    if len(data) < HEADER.size + WORLD.size:
+        raise ValueError("not a saved world state")
+    magic, version, tick_rate, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a saved world state")
+    if version != VERSION or tick_rate != TICK_RATE:
+        raise ValueError(f"the state was saved by an incompatible version of the game "
+                         f"(format {version}, {tick_rate} ticks/s)")
+    values = dict(zip(WORLD_FIELDS, WORLD.unpack_from(data, HEADER.size)))
+    arrays = {}
+    for i in range(count):
+        name, dtype, length, offset = ARRAY.unpack_from(data, HEADER.size + WORLD.size + ARRAY.size * i)
+        arrays[name.rstrip(b"\0").decode()] = np.frombuffer(data, dtype.rstrip(b"\0").decode(), length, offset)
+    return values, arrays
+
+def restore(world, data):
+    """Put world in the state saved in data (bytes, or a file mapped by read())"""
+    values, arrays = read_state(data)
+    world.seed = values["seed"]
+    world.width = values["width"]
+    world.height = values["height"]
+    world.num_targets = values["num_targets"]
+    world.num_obstacles = values["num_obstacles"]
+    world.chunked = bool(values["chunked"])
+    world.time = values["time"]
+    world.wave = values["wave"]
+    world.wave_start = values["wave_start"]
+    world.grace_period = bool(values["grace_period"])
+    world.grace_period_start = values["grace_period_start"]
+    world.game_over = bool(values["game_over"])
+    world.max_targets = None if values["max_targets"] == NO_CAP else values["max_targets"]
+    world.max_projectiles = None if values["max_projectiles"] == NO_CAP else values["max_projectiles"]
+    world.events = []
+    # Set in place, as the targets draw from the same Generator
+    world.rng.bit_generator.state = {
+        "bit_generator": "PCG64",
+        "state": {"state": int.from_bytes(values["rng_state"], "little"),
+                  "inc": int.from_bytes(values["rng_inc"], "little")},
+        "has_uint32": values["rng_has_uint32"], "uinteger": values["rng_uinteger"]}
+
+    player = Player(values["x"], values["y"], values["player_id"])
+    world.players = [player]
+    world.next_player_id = player.id + 1
+    player.prev_x = values["prev_x"]
+    player.prev_y = values["prev_y"]
+    player.angle = values["angle"]
+    player.last_shot_time = values["last_shot_time"]
+    # Saved by name, so states stay valid when weapons are added to weapons.json
+    player.weapon = WEAPONS.index[values["weapon"].rstrip(b"\0").decode()]
+    player.health = values["health"]
+    player.score = values["score"]
+    player.shots_fired = values["shots_fired"]
+    player.shots_hit = values["shots_hit"]
+
+    # Obstacles: the collision grid, spawn raster and routes are only rebuilt if they changed
+    new_map = False
+    if world.chunked:
+        chunks = world.chunks
+        keep_clear = (values["keep_clear_x"], values["keep_clear_y"])
+        if (chunks is None or chunks.seed != values["map_seed"] or chunks.keep_clear != keep_clear
+                or chunks.per_chunk != values["per_chunk"] or chunks.chunk_size != values["chunk_size"]
+                or (chunks.width, chunks.height) != (world.width, world.height)):
+            # A map's chunks are generated again as they are needed, the same as before
+            world.chunks = ChunkedObstacles(world.width, world.height, values["map_seed"], values["per_chunk"],
+                                            keep_clear=keep_clear, chunk_size=values["chunk_size"])
+            new_map = True
+    else:
+        world.chunks = None
+    # (index_obstacles also bumps arena_version, so drawing caches know the arena changed)
+    area = (values["left"], values["top"], values["right"], values["bottom"])
+    obstacles = np.column_stack((arrays["obstacle_x"], arrays["obstacle_y"]))
+    if (new_map or area != world.area
+            or not np.array_equal(obstacles, entity_boxes(world.obstacles)[:, :2])):
+        world.area = area
+        world.obstacles = [Obstacle(int(x), int(y)) for x, y in obstacles.tolist()]  # Always whole pixels
+        world.index_obstacles()
+
+    flow_field = world.flow_field
+    flow_field.goal = (values["route_goal"],) if values["route_goal"] >= 0 else ()
+    flow_field.next_cell = arrays["route_next"].astype(np.intp)
+    flow_field.search = None
+    if values["searching"]:
+        flow_field.search = ((values["search_goal"],),
+                             list(zip(arrays["search_queue_d"].tolist(), arrays["search_queue_cell"].tolist())),
+                             arrays["search_distance"].tolist(), arrays["search_next"].tolist())
+
+    targets = world.targets
+    for name in TARGET_ARRAYS:
+        setattr(targets, name, arrays[f"target_{name}"].copy())
+    targets.capacity = len(targets.alive)
+    targets.free_slots = arrays["target_free"].tolist()
+    projectiles = world.projectiles
+    for name in PROJECTILE_ARRAYS:
+        setattr(projectiles, name, arrays[f"shot_{name}"].copy())
+    projectiles.capacity = len(projectiles.active)
+    projectiles.free_slots = arrays["projectile_free"].tolist()
+    projectiles.last_dt = values["last_dt"]
+    world.index_targets()
+
+    # Medkits are recycled, as in the game
+    world.spare_medkits.extend(world.medkits)
+    world.medkits = []
+    for x, y in zip(arrays["medkit_x"].tolist(), arrays["medkit_y"].tolist()):
+        medkit = world.spare_medkits.pop() if world.spare_medkits else Medkit(0, 0)
+        medkit.place(int(x), int(y))
+        world.medkits.append(medkit)
+    world.medkit_rects = [medkit.rect for medkit in world.medkits]
+
+def read(path):
+    """A saved state from a file, mapped into memory rather than read (for restore or GameWorld(state=...))"""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def write(world, path):
+    """Save the state of world to a file"""
+    with open(path, "wb") as f:
+        f.write(save(world))
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from world import OBSTACLES_PER_CHUNK
+    parser = argparse.ArgumentParser(description="Write a pre-built arena for shootergame.py --arena")
+    parser.add_argument("path", help="file to write")
+    parser.add_argument("--seed", type=int, default=None, help="seed the arena is generated from")
+    parser.add_argument("--size", default="1400x800", metavar="WIDTHxHEIGHT", help="arena size")
+    parser.add_argument("--map", action="store_true", help="make it a scrolling map of that size")
+    args = parser.parse_args()
+
+    width, height = (int(n) for n in args.size.lower().split("x"))
+    start = time.perf_counter()
+    if args.map:
+        world = GameWorld(width, height, num_obstacles=OBSTACLES_PER_CHUNK, seed=args.seed, chunked=True)
+    else:
+        world = GameWorld(width, height, seed=args.seed)
+    generated = time.perf_counter() - start
+    write(world, args.path)
+    start = time.perf_counter()
+    GameWorld(state=read(args.path))
+    loaded = time.perf_counter() - start
+    print(f"wrote {args.path} ({len(save(world))} bytes, seed {world.seed}): "
+          f"generating took {generated * 1000:.1f}ms, loading it takes {loaded * 1000:.1f}ms")
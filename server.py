@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import struct
+import time
+from collections import deque
+import net
+from replay import RECORD, unpack_input
+from world import GameWorld, PlayerInput, TICK, OBSTACLES_PER_CHUNK
+
+# Authoritative game server: steps one world at the fixed tick rate and sends snapshots of
+# it to every client over UDP (see net.py for the protocol), e.g.
+#
+#   python server.py --seed 7      then      python client.py
+#
+# Every client that joins gets a player of its own in the same arena, up to MAX_PLAYERS;
+# clients joining after that watch, and take over the player of the next client to leave.
+
+MAX_PLAYERS = 4          # Players in one arena; further clients watch
+MAX_QUEUED_INPUTS = 8    # Inputs waiting beyond this are dropped, so a client running ahead can't build up lag
+MAX_CATCH_UP = 30        # Ticks run at most to catch up after a stall; the rest are skipped
+
+class Client:
+    """What the server knows of one connected client"""
+    def __init__(self, address, now):
+        self.address = address
+        self.inputs = deque()      # (sequence number, PlayerInput) received but not yet applied, oldest first
+        self.newest_input = 0      # Sequence number of the newest input received
+        self.applied_input = 0     # Sequence number of the newest input applied to the world
+        self.player_id = net.NO_PLAYER  # Id of the client's player in the world, or NO_PLAYER while it watches
+        self.held = PlayerInput()  # Last input applied, held while the next one is late
+        self.acked_tick = None     # Newest snapshot the client said it has
+        self.last_heard = now
+
+class GameServer(asyncio.DatagramProtocol):
+    """
+    Steps the world with every playing client's inputs, one per tick each, and sends every
+    client a snapshot each SNAPSHOT_INTERVAL ticks as the difference from the newest snapshot
+    that client confirmed. Clients confirming the same snapshot share one encoding
+    """
+    def __init__(self, world):
+        self.world = world
+        self.clients = {}          # Address -> Client, in the order they joined
+        self.history = {}          # Tick -> snapshot tables sent then, for the last HISTORY snapshots
+        self.tick = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        if not data:
+            return
+        kind = data[0]
+        if kind == net.BYE:
+            if address in self.clients:
+                self.leave(address)
+            return
+        client = self.clients.get(address)
+        if client is None:
+            if kind not in (net.HELLO, net.INPUT):
+                return
+            # Joining: a HELLO or (if that was lost) the first input packet
+            client = self.clients[address] = Client(address, time.monotonic())
+            self.seat(client)
+            print(f"{address[0]}:{address[1]} joined ({len(self.clients)} connected, "
+                  f"{'playing' if client.player_id != net.NO_PLAYER else 'watching'})")
+        client.last_heard = time.monotonic()
+        if kind == net.INPUT:
+            self.receive_inputs(client, data)
+
+    def receive_inputs(self, client, data):
+        """Queue the inputs of an input packet the client hasn't sent before"""
+        try:
+            _, newest, acked_tick, count = net.INPUT_HEADER.unpack_from(data)
+            received = [unpack_input(*record) for record in
+                        RECORD.iter_unpack(data[net.INPUT_HEADER.size:
+                                                net.INPUT_HEADER.size + count * RECORD.size])]
+        except (struct.error, ValueError):
+            return  # Malformed packet, or a weapon that doesn't exist
+        if acked_tick != net.NO_BASELINE and (client.acked_tick is None or acked_tick > client.acked_tick):
+            client.acked_tick = acked_tick
+        for sequence, inputs in enumerate(received, newest - len(received) + 1):
+            if sequence > client.newest_input:
+                client.inputs.append((sequence, inputs))
+                client.newest_input = sequence
+        while len(client.inputs) > MAX_QUEUED_INPUTS:
+            client.inputs.popleft()  # Also keeps the queues of watching clients from growing
+
+    def seat(self, client):
+        """
+        Give a client that just joined a player: one no client has (the world always keeps
+        one), or a new one while there are fewer than MAX_PLAYERS. Otherwise it watches
+        """
+        world = self.world
+        taken = {other.player_id for other in self.clients.values()}
+        free = [player.id for player in world.players if player.id not in taken]
+        if free:
+            client.player_id = free[0]
+        elif len(world.players) < MAX_PLAYERS:
+            client.player_id = world.add_player().id
+
+    def leave(self, address):
+        """Forget a client; the longest waiting watcher takes over its player, or it leaves the arena"""
+        client = self.clients.pop(address)
+        if client.player_id == net.NO_PLAYER:
+            return
+        watching = [other for other in self.clients.values() if other.player_id == net.NO_PLAYER]
+        if watching:
+            watching[0].player_id = client.player_id
+            watching[0].inputs.clear()  # Sent while watching; they were never meant for a player
+        else:
+            world = self.world
+            world.remove_player(next(player for player in world.players if player.id == client.player_id))
+
+    def next_input(self, client):
+        """The input a playing client's player gets this tick"""
+        if client.inputs:
+            client.applied_input, inputs = client.inputs.popleft()
+            client.held = inputs
+            # One player can't restart the round for everyone; only a game that is over
+            inputs.restart = inputs.restart and self.world.game_over
+            return inputs
+        # The input is late: keep holding the same buttons, but don't repeat key presses
+        held = client.held
+        return PlayerInput(up=held.up, down=held.down, left=held.left, right=held.right,
+                           fire=held.fire, aim_x=held.aim_x, aim_y=held.aim_y)
+
+    def step(self):
+        """Advance the world one tick with every player's next input, and send snapshots when due"""
+        playing = {client.player_id: client for client in self.clients.values()}
+        # Players in world order; a player no client has stands still
+        inputs = [self.next_input(playing[player.id]) if player.id in playing else PlayerInput()
+                  for player in self.world.players]
+        self.world.step(TICK, inputs)
+        self.tick += 1
+        if self.tick % net.SNAPSHOT_INTERVAL == 0:
+            self.send_snapshots()
+
+    def send_snapshots(self):
+        """Send this tick's snapshot to every client, relative to the newest one it confirmed"""
+        tables = net.snapshot(self.world)
+        self.history[self.tick] = tables
+        self.history.pop(self.tick - net.HISTORY * net.SNAPSHOT_INTERVAL, None)
+        encoded = {}  # Baseline tick -> encoded snapshot
+        for client in self.clients.values():
+            baseline = client.acked_tick if client.acked_tick in self.history else net.NO_BASELINE
+            if baseline not in encoded:
+                encoded[baseline] = net.encode(tables, self.history.get(baseline))
+            header = net.SNAPSHOT_HEADER.pack(net.SNAPSHOT, self.tick, baseline, client.applied_input,
+                                              client.player_id)
+            self.transport.sendto(header + encoded[baseline], client.address)
+
+    def drop_silent_clients(self):
+        """Forget clients that haven't sent anything for CLIENT_TIMEOUT seconds"""
+        now = time.monotonic()
+        for address, client in list(self.clients.items()):
+            if now - client.last_heard > net.CLIENT_TIMEOUT:
+                self.leave(address)
+                print(f"{address[0]}:{address[1]} timed out ({len(self.clients)} connected)")
+
+    async def run(self):
+        """Step the world at the tick rate for as long as anyone is connected"""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            self.drop_silent_clients()
+            now = loop.time()
+            if not self.clients:
+                # Nobody playing: the world waits
+                next_tick = now
+                await asyncio.sleep(0.05)
+                continue
+            if now - next_tick > MAX_CATCH_UP * TICK:
+                next_tick = now - MAX_CATCH_UP * TICK  # Too far behind: skip the rest
+            while next_tick <= now:
+                self.step()
+                next_tick += TICK
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+async def start_server(world, host="127.0.0.1", port=net.DEFAULT_PORT):
+    """Open the server's socket and return the transport and the GameServer (call its run())"""
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(lambda: GameServer(world), local_addr=(host, port))
+
+async def main(args):
+    if args.map:
+        width, height = (int(n) for n in args.map.lower().split("x"))
+        world = GameWorld(width, height, num_obstacles=OBSTACLES_PER_CHUNK, seed=args.seed, chunked=True)
+    else:
+        world = GameWorld(seed=args.seed)
+    transport, server = await start_server(world, args.host, args.port)
+    print(f"Serving on {args.host}:{args.port}")
+    try:
+        await server.run()
+    finally:
+        transport.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the authoritative game server for network play")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=net.DEFAULT_PORT, help="UDP port to listen on")
+    parser.add_argument("--seed", type=int, default=None, help="seed the arena for a repeatable game")
+    parser.add_argument("--map", default=None, metavar="WIDTHxHEIGHT",
+                        help="play on a scrolling map of this size instead of the default arena")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
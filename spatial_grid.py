@@ -0,0 +1,120 @@
+import math
+import numpy as np
+
+def boxes_overlap(boxes, x, y, width, height):
+    """Return a mask of which boxes (rows of x, y, width, height) overlap the box x, y, width, height"""
+    # Same rule as pygame.Rect.colliderect: touching edges do not count as overlapping
+    # boxes may have any number of leading axes; x, y, width and height broadcast against them
+    return ((boxes[..., 0] < x + width) & (x < boxes[..., 0] + boxes[..., 2]) &
+            (boxes[..., 1] < y + height) & (y < boxes[..., 1] + boxes[..., 3]))
+
+class SpatialGrid:
+    """
+    Uniform grid that buckets axis-aligned boxes by the cells they cover
+    Static boxes (obstacles) are indexed once with set_static and dynamic boxes (targets)
+    are re-bucketed every frame with set_dynamic. A query only visits the cells its box
+    touches, so it costs the number of nearby items instead of every item in the arena
+    Boxes are rows of (x, y, width, height) and items are identified by their row index.
+    The grid covers width x height pixels from left, top; boxes outside it use the border cells
+    """
+    STATIC = 0    # Layer for things that never move (obstacles)
+    DYNAMIC = 1   # Layer rebuilt every frame (targets)
+
+    def __init__(self, width, height, cell_size=64):
+        self.cell_size = cell_size     # Side length of one grid cell in pixels
+        self.resize(width, height)
+
+    def resize(self, width, height, left=0, top=0):
+        """Cover a new area; both layers are emptied and must be set again"""
+        self.left = left               # World position of the grid's top-left corner
+        self.top = top
+        self.cols = max(1, math.ceil(width / self.cell_size))
+        self.rows = max(1, math.ceil(height / self.cell_size))
+        empty = np.zeros((0, 4))
+        self.layers = [self._build_layer(empty), self._build_layer(empty)]
+
+    def _cells_for_boxes(self, boxes):
+        """Return matching arrays of (box index, cell index) for every cell each box covers"""
+        # Cell range covered by each box, clamped so boxes outside the arena use the border cells
+        x = boxes[:, 0] - self.left
+        y = boxes[:, 1] - self.top
+        cx0 = np.clip((x // self.cell_size).astype(np.intp), 0, self.cols - 1)
+        cy0 = np.clip((y // self.cell_size).astype(np.intp), 0, self.rows - 1)
+        cx1 = np.clip(((x + boxes[:, 2]) // self.cell_size).astype(np.intp), 0, self.cols - 1)
+        cy1 = np.clip(((y + boxes[:, 3]) // self.cell_size).astype(np.intp), 0, self.rows - 1)
+        span_x = cx1 - cx0 + 1
+        cell_counts = span_x * (cy1 - cy0 + 1)
+
+        # Expand every box into one entry per covered cell without a Python loop
+        box_index = np.repeat(np.arange(len(boxes)), cell_counts)
+        first_entry = np.cumsum(cell_counts) - cell_counts
+        k = np.arange(len(box_index)) - np.repeat(first_entry, cell_counts)  # Position inside each box's cell range
+        span_x = np.repeat(span_x, cell_counts)
+        cx = np.repeat(cx0, cell_counts) + k % span_x
+        cy = np.repeat(cy0, cell_counts) + k // span_x
+        return box_index, cy * self.cols + cx
+
+    def _build_layer(self, boxes):
+        """Bucket boxes into cells; each cell's items end up contiguous in one sorted array"""
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        box_index, cell = self._cells_for_boxes(boxes)
+        order = np.argsort(cell, kind="stable")
+        counts = np.bincount(cell, minlength=self.cols * self.rows)
+        starts = np.cumsum(counts) - counts
+        return boxes, box_index[order], starts, counts
+
+    def set_static(self, boxes):
+        """Index the boxes that do not move (called when obstacles change)"""
+        self.layers[self.STATIC] = self._build_layer(boxes)
+
+    def set_dynamic(self, boxes):
+        """Re-bucket the boxes that move (called every frame)"""
+        self.layers[self.DYNAMIC] = self._build_layer(boxes)
+
+    def query(self, x, y, width, height, layer):
+        """Return the indices of items in layer whose boxes overlap the box x, y, width, height"""
+        boxes, items, starts, counts = self.layers[layer]
+        cx0 = min(max(int((x - self.left) // self.cell_size), 0), self.cols - 1)
+        cy0 = min(max(int((y - self.top) // self.cell_size), 0), self.rows - 1)
+        cx1 = min(max(int((x - self.left + width) // self.cell_size), 0), self.cols - 1)
+        cy1 = min(max(int((y - self.top + height) // self.cell_size), 0), self.rows - 1)
+
+        found = []
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                cell = cy * self.cols + cx
+                for item in items[starts[cell]:starts[cell] + counts[cell]]:
+                    bx, by, bw, bh = boxes[item]
+                    if bx < x + width and x < bx + bw and by < y + height and y < by + bh and item not in found:
+                        found.append(int(item))
+        found.sort()
+        return found
+
+    def query_pairs(self, boxes, layer):
+        """
+        Batched query: return matching arrays (query index, item index) for every query box
+        that overlaps an item in layer. Pairs are sorted by query index, then item index
+        """
+        layer_boxes, items, starts, counts = self.layers[layer]
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        query_index, cell = self._cells_for_boxes(boxes)
+
+        # Expand every (query, cell) entry into one candidate per item stored in that cell
+        per_entry = counts[cell]
+        query_index = np.repeat(query_index, per_entry)
+        first_entry = np.cumsum(per_entry) - per_entry
+        k = np.arange(len(query_index)) - np.repeat(first_entry, per_entry)
+        item_index = items[np.repeat(starts[cell], per_entry) + k]
+
+        # An item spanning several cells shows up once per shared cell, so drop duplicates
+        num_items = max(len(layer_boxes), 1)
+        key = np.unique(query_index * num_items + item_index)
+        query_index = key // num_items
+        item_index = key % num_items
+
+        # Exact overlap test on the surviving candidates
+        a = boxes[query_index]
+        b = layer_boxes[item_index]
+        hit = ((a[:, 0] < b[:, 0] + b[:, 2]) & (b[:, 0] < a[:, 0] + a[:, 2]) &
+               (a[:, 1] < b[:, 1] + b[:, 3]) & (b[:, 1] < a[:, 1] + a[:, 3]))
+        return query_index[hit], item_index[hit]
@@ -0,0 +1,121 @@
+import math
+import numpy as np
+
+SAMPLE_TRIES = 16  # Random tries at a position far enough away before checking them all
+
+class SpawnError(RuntimeError):
+    """Raised when there is no room left in the arena for something to spawn"""
+
+class FreeSpaceSampler:
+    """
+    Picks random free positions for new obstacles, targets and medkits in bounded time
+    The arena is rasterized into small cells marked occupied wherever an obstacle is.
+    A summed-area table of that raster tells, for every cell at once, whether a box placed
+    there would touch an occupied cell, so a valid position is drawn from the list of free
+    ones directly instead of retrying random positions until one happens to fit.
+    The raster covers width x height pixels from left, top (all positions are world positions)
+    """
+    def __init__(self, width, height, resolution=4):
+        self.resolution = resolution   # Cell size in pixels; spawn positions are multiples of it
+        self.resize(width, height)
+
+    def resize(self, width, height, left=0, top=0):
+        """Cover a new area; all occupied cells are cleared"""
+        self.left = left               # World position of the raster's top-left corner
+        self.top = top
+        self.width = width
+        self.height = height
+        self.cols = max(1, math.ceil(width / self.resolution))
+        self.rows = max(1, math.ceil(height / self.resolution))
+        self.clear()
+
+    def clear(self):
+        """Mark the whole arena as free"""
+        self.occupied = np.zeros((self.rows, self.cols), dtype=np.int32)
+        self._table = None
+        self._candidates = {}  # (width, height) -> free positions as flat indices, and row length
+
+    def add_boxes(self, boxes):
+        """Mark the cells covered by boxes (rows of x, y, width, height) as occupied"""
+        r = self.resolution
+        for x, y, w, h in boxes:
+            # Round outwards so every pixel of the box falls in a marked cell
+            x -= self.left
+            y -= self.top
+            c0 = max(0, math.floor(x / r))
+            r0 = max(0, math.floor(y / r))
+            c1 = min(self.cols, math.ceil((x + w) / r))
+            r1 = min(self.rows, math.ceil((y + h) / r))
+            if c1 > c0 and r1 > r0:  # Boxes outside the raster mark nothing
+                self.occupied[r0:r1, c0:c1] = 1
+        self._table = None  # Rebuilt on the next sample
+        self._candidates = {}
+
+    def _summed_area(self):
+        """table[r, c] = number of occupied cells above and to the left of cell (r, c)"""
+        if self._table is None:
+            self._table = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int32)
+            self._table[1:, 1:] = self.occupied.cumsum(axis=0).cumsum(axis=1)
+        return self._table
+
+    def free_positions(self, width, height):
+        """
+        Boolean grid of which cell corners can hold a width x height box that stays inside
+        the arena and touches no occupied cell. Entry [row, col] is the position
+        (col * resolution, row * resolution)
+        """
+        r = self.resolution
+        span_c = math.ceil(width / r)   # Cells covered by the box
+        span_r = math.ceil(height / r)
+        n_c = min(math.floor((self.width - width) / r), self.cols - span_c) + 1
+        n_r = min(math.floor((self.height - height) / r), self.rows - span_r) + 1
+        if n_c <= 0 or n_r <= 0:
+            return np.zeros((0, 0), dtype=bool)  # The box is bigger than the arena
+
+        # Occupied cells under each candidate box, from four corners of the summed-area table
+        t = self._summed_area()
+        covered = (t[span_r:span_r + n_r, span_c:span_c + n_c] - t[:n_r, span_c:span_c + n_c]
+                   - t[span_r:span_r + n_r, :n_c] + t[:n_r, :n_c])
+        return covered == 0
+
+    def sample(self, rng, width, height, away_from=None, min_distance=0):
+        """
+        Return the top-left (x, y) of a random free position for a width x height box
+        If away_from is a point (or a sequence of points), the box center must be at least
+        min_distance from it (from each of them).
+        rng is a NumPy random Generator (the world's random stream).
+        Raises SpawnError if no position satisfies the constraints
+        """
+        key = (width, height)
+        if key not in self._candidates:
+            free = self.free_positions(width, height)
+            self._candidates[key] = (np.flatnonzero(free), free.shape[1] if free.size else 1)
+        candidates, cols = self._candidates[key]
+        r = self.resolution
+
+        if away_from is not None and len(candidates):
+            points = np.asarray(away_from, dtype=float).reshape(-1, 2)
+
+            def far(row, col):
+                """Whether the boxes at row, col are far enough from every point"""
+                return (np.hypot(self.left + col[:, None] * r + width / 2 - points[:, 0],
+                                 self.top + row[:, None] * r + height / 2 - points[:, 1])
+                        >= min_distance).all(axis=1)
+
+            # Usually most free positions are far enough away, so a few random tries find one
+            # without measuring the distance of every candidate; the first one that passes is
+            # still uniformly random among the allowed positions
+            tries = candidates[rng.integers(len(candidates), size=SAMPLE_TRIES)]
+            row, col = np.divmod(tries, cols)
+            passed = far(row, col)
+            if passed.any():
+                first = int(np.argmax(passed))
+                return self.left + int(col[first]) * r, self.top + int(row[first]) * r
+            # Otherwise fall back to checking every candidate
+            candidates = candidates[far(*np.divmod(candidates, cols))]
+
+        if not len(candidates):
+            raise SpawnError(f"no free position for a {width}x{height} box in a "
+                             f"{self.width}x{self.height} arena")
+        row, col = divmod(int(candidates[rng.integers(len(candidates))]), cols)
+        return self.left + col * r, self.top + row * r
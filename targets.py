@@ -0,0 +1,190 @@
+import math
+import numpy as np
+from spatial_grid import SpatialGrid
+
+# Target properties
+TARGET_SIZE = 30                         # Targets are 30x30 squares
+TARGET_HEALTH = 100                      # Starting (and maximum) health
+TARGET_MAX_SHOT_DELAY = 1                # Delay between shots is random in 0-1 seconds (in the first wave)
+TARGET_MAX_ANGLE_VARIANCE = math.radians(5)  # Maximum 5 degrees spread on shots
+
+def nearest_player_centers(players, x, y):
+    """
+    Center of the player nearest to each point x, y (arrays); with a single player its
+    center as two numbers
+    """
+    if len(players) == 1:
+        player = players[0]
+        return player.x + player.width // 2, player.y + player.height // 2
+    center_x = np.array([p.x + p.width // 2 for p in players], dtype=float)
+    center_y = np.array([p.y + p.height // 2 for p in players], dtype=float)
+    nearest = np.argmin(np.hypot(center_x - x[:, None], center_y - y[:, None]), axis=1)
+    return center_x[nearest], center_y[nearest]
+
+class TargetSwarm:
+    """
+    All the enemy targets that chase and shoot at the players, stored as NumPy arrays
+    Each target is a slot in the arrays, so chasing, range checks, fire timers and aim
+    spread for every target are computed at once instead of target by target.
+    Destroyed targets free their slot for the next spawn, like ProjectilePool
+    """
+    def __init__(self, rng, capacity=64):
+        self.rng = rng                         # The world's random stream (a NumPy Generator)
+        self.width = TARGET_SIZE               # Every target has the same size
+        self.height = TARGET_SIZE
+        self.capacity = 0
+        self.free_slots = []                   # Stack of unused slot indices
+        self.x = np.zeros(0)                   # Top-left X positions
+        self.y = np.zeros(0)                   # Top-left Y positions
+        self.prev_x = np.zeros(0)              # Positions at the start of the last tick (for drawing between ticks)
+        self.prev_y = np.zeros(0)
+        self.speed = np.zeros(0)               # Movement speed in pixels per second
+        self.health = np.zeros(0)
+        self.max_health = np.zeros(0)
+        self.last_shot_time = np.zeros(0)      # When each target last fired
+        self.next_shot_delay = np.zeros(0)     # Seconds until each target may fire again
+        self.max_shot_delay = np.zeros(0)      # Longest delay between each target's shots
+        self.shooting_range = np.zeros(0)      # Targets only shoot at a player this close
+        self.max_angle_variance = np.zeros(0)  # Maximum spread on shots (radians)
+        self.alive = np.zeros(0, dtype=bool)   # Whether the slot holds a live target
+        self._grow(capacity)
+
+    def _grow(self, new_capacity):
+        """Enlarge every array to new_capacity slots, keeping existing targets"""
+        extra = new_capacity - self.capacity
+        for name in ("x", "y", "prev_x", "prev_y", "speed", "health", "max_health", "last_shot_time",
+                     "next_shot_delay", "max_shot_delay", "shooting_range", "max_angle_variance"):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(extra)]))
+        self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+        # New slots are pushed highest-first so the lowest index is handed out next
+        self.free_slots.extend(range(new_capacity - 1, self.capacity - 1, -1))
+        self.capacity = new_capacity
+
+    def __len__(self):
+        """Number of live targets"""
+        return self.capacity - len(self.free_slots)
+
+    def spawn(self, x, y, current_time, shooting_range, speed, max_shot_delay=TARGET_MAX_SHOT_DELAY):
+        """Add a target at x, y and return its slot index"""
+        if not self.free_slots:
+            self._grow(self.capacity * 2)
+        i = self.free_slots.pop()
+        self.x[i] = self.prev_x[i] = x
+        self.y[i] = self.prev_y[i] = y
+        self.speed[i] = speed
+        self.health[i] = self.max_health[i] = TARGET_HEALTH
+        self.last_shot_time[i] = current_time
+        self.max_shot_delay[i] = max_shot_delay
+        self.next_shot_delay[i] = self.rng.uniform(0, max_shot_delay)
+        self.shooting_range[i] = shooting_range
+        self.max_angle_variance[i] = TARGET_MAX_ANGLE_VARIANCE
+        self.alive[i] = True
+        return i
+
+    def live(self):
+        """Indices of all live targets"""
+        return np.flatnonzero(self.alive)
+
+    def kill(self, i):
+        """Remove a destroyed target and free its slot"""
+        if self.alive[i]:
+            self.alive[i] = False
+            self.free_slots.append(int(i))
+
+    def clear(self):
+        """Remove every target"""
+        for i in self.live():
+            self.kill(i)
+
+    def boxes(self, indices):
+        """Collision boxes (x, y, width, height) of the given slots"""
+        n = len(indices)
+        return np.column_stack((self.x[indices], self.y[indices],
+                                np.full(n, self.width, dtype=float), np.full(n, self.height, dtype=float)))
+
+    def chase(self, players, grid, flow_field, dt):
+        """
+        Move every live target towards the nearest of players along the flow field's routes around obstacles
+        A target blocked by an obstacle slides along it, moving on one axis if the other is blocked
+        """
+        np.copyto(self.prev_x, self.x)
+        np.copyto(self.prev_y, self.y)
+        live = self.live()
+
+        # Direction vectors from every target center to where its route goes next
+        center_x = self.x[live] + self.width // 2
+        center_y = self.y[live] + self.height // 2
+        goal_x, goal_y = flow_field.steer(center_x, center_y,
+                                          *nearest_player_centers(players, center_x, center_y))
+        dx = goal_x - center_x
+        dy = goal_y - center_y
+
+        # Normalize the direction vectors (make them length 1) so speed doesn't depend on distance
+        length = np.hypot(dx, dy)
+        moving = length > 0  # Avoid division by zero
+        live, dx, dy, length = live[moving], dx[moving], dy[moving], length[moving]
+        step = self.speed[live] * dt / length
+        new_x = self.x[live] + dx * step
+        new_y = self.y[live] + dy * step
+
+        # Only move targets whose new position is clear of obstacles
+        n = len(live)
+        new_boxes = np.column_stack((new_x, new_y, np.full(n, self.width, dtype=float),
+                                     np.full(n, self.height, dtype=float)))
+        blocked, _ = grid.query_pairs(new_boxes, SpatialGrid.STATIC)
+        free_to_move = np.ones(n, dtype=bool)
+        free_to_move[blocked] = False
+        self.x[live[free_to_move]] = new_x[free_to_move]
+        self.y[live[free_to_move]] = new_y[free_to_move]
+
+        # Blocked targets slide along the obstacle: they take just the x part of their move
+        # if that is clear, otherwise just the y part, so they don't stick to corners
+        blocked = np.flatnonzero(~free_to_move)
+        if len(blocked):
+            i = live[blocked]
+            m = len(i)
+            slides = np.column_stack((np.concatenate((new_x[blocked], self.x[i])),
+                                      np.concatenate((self.y[i], new_y[blocked])),
+                                      np.full(2 * m, self.width, dtype=float),
+                                      np.full(2 * m, self.height, dtype=float)))
+            stuck, _ = grid.query_pairs(slides, SpatialGrid.STATIC)
+            clear = np.ones(2 * m, dtype=bool)
+            clear[stuck] = False
+            slide_x, slide_y = clear[:m], clear[m:] & ~clear[:m]
+            self.x[i[slide_x]] = new_x[blocked][slide_x]
+            self.y[i[slide_y]] = new_y[blocked][slide_y]
+
+    def shoot(self, players, current_time):
+        """
+        Update fire timers and aim for every live target (at the nearest of players)
+        Returns arrays (start x, start y, angle) of the shots fired this tick
+        """
+        live = self.live()
+
+        # Targets whose delay has run out reset their timer, whether or not a player is in range
+        ready = live[current_time - self.last_shot_time[live] >= self.next_shot_delay[live]]
+        self.last_shot_time[ready] = current_time
+        self.next_shot_delay[ready] = self.rng.uniform(0, self.max_shot_delay[ready])
+
+        # Shots start at the target center and aim at the nearest player's center
+        start_x = self.x[ready] + self.width // 2
+        start_y = self.y[ready] + self.height // 2
+        player_x, player_y = nearest_player_centers(players, start_x, start_y)
+        dx = player_x - start_x
+        dy = player_y - start_y
+
+        # Only targets with that player within shooting range fire
+        in_range = np.hypot(dx, dy) <= self.shooting_range[ready]
+        ready = ready[in_range]
+        start_x = start_x[in_range]
+        start_y = start_y[in_range]
+        dx = dx[in_range]
+        dy = dy[in_range]
+
+        # Add random variance to make shots less perfect, drawn for all shooters at once
+        # Standard deviation of max/2 means ~95% of shots within ±max_angle_variance,
+        # and clamping prevents extreme outliers
+        max_variance = self.max_angle_variance[ready]
+        variance = np.clip(self.rng.normal(0, 1, len(ready)) * (max_variance / 2), -max_variance, max_variance)
+        return start_x, start_y, np.arctan2(dy, dx) + variance
+
@@ -0,0 +1,425 @@
+import numpy as np
+from collision import swept_hit_times
+from spatial_grid import boxes_overlap
+from spawning import FreeSpaceSampler, SpawnError
+from targets import TARGET_SIZE, TARGET_HEALTH, TARGET_MAX_SHOT_DELAY, TARGET_MAX_ANGLE_VARIANCE
+from world import (TICK, ARENA_WIDTH, ARENA_HEIGHT, NUM_TARGETS, NUM_OBSTACLES,
+                   PAINTBALL_RADIUS, BULLET_RADIUS, BULLET_SPEED, BULLET_DAMAGE, MAX_RANGE_BULLET,
+                   HEALTH_THRESHOLD, MAX_HEALTH, TARGET_SPEED, TARGET_SHOOTING_RANGE,
+                   GRACE_PERIOD_DURATION)
+from weapons import WEAPONS
+
+# Many independent arenas stepped together for training agents. The rules are the ones
+# GameWorld plays by (same constants, movement, spawning, swept hits, medkits), but every
+# quantity is an array with one row per world, so a step costs a handful of NumPy calls
+# however many worlds there are. The one simplification is that targets chase the player
+# in a straight line instead of along GameWorld's flow field routes (a route search per
+# world would cost more than the rest of the step), e.g.
+#
+#   env = VecShooterEnv(256, seed=0)
+#   observations = env.reset()
+#   observations, rewards, dones, info = env.step(actions)   # actions: (256, ACTION_SIZE)
+
+PLAYER_SIZE = 20     # Same sizes as the Player, Medkit and Obstacle classes
+MEDKIT_SIZE = 20
+OBSTACLE_SIZE = 60
+NOWHERE = -1e9       # Where obstacles that did not fit and targets that could not respawn are put
+
+# Weapon properties indexed by weapon number, in weapons.json order (0 is the AR-15, 1 the
+# sniper...). They are the weapon table's own arrays, so changes to the table apply here too
+WEAPON_DAMAGE = WEAPONS.damage
+WEAPON_RANGE = WEAPONS.range
+WEAPON_SPEED = WEAPONS.projectile_speed
+WEAPON_FIRE_DELAY = WEAPONS.fire_delay
+WEAPON_SPREAD = WEAPONS.spread
+WEAPON_MOVE_SPEED = WEAPONS.move_speed
+WEAPON_PELLETS = WEAPONS.pellets
+
+# Columns of the action array
+ACTION_MOVE_X = 0    # Below 0 moves left, above 0 right
+ACTION_MOVE_Y = 1    # Below 0 moves up, above 0 down
+ACTION_FIRE = 2      # Above 0.5 holds the trigger
+ACTION_AIM = 3       # Aim direction in radians (0 is right, pi/2 is down)
+ACTION_WEAPON = 4    # 0 keeps the weapon, n switches to weapon n - 1 (1 the AR-15, 2 the sniper...)
+ACTION_SIZE = 5
+
+class VecShooterEnv:
+    """
+    num_worlds arenas of the shooter game in batched NumPy state, stepped one tick at a time
+    step(actions) takes one action row per world and returns (observations, rewards, dones,
+    info). A world whose player died is reset straight away, so the observation returned for
+    it is the first one of its next episode; info holds the final score and length of the
+    episodes that ended. Rewards are +1 per target destroyed and -1 per MAX_HEALTH of damage taken
+
+    Observation rows (float32, all positions relative to the arena size):
+    player x, y, health, weapon number, can shoot, in grace period; then for every target its
+    offset from the player and health; then medkit active and offset; then for every
+    obstacle whether it exists and its offset
+    """
+    def __init__(self, num_worlds, width=ARENA_WIDTH, height=ARENA_HEIGHT, num_targets=NUM_TARGETS,
+                 num_obstacles=NUM_OBSTACLES, max_projectiles=64, grace_period=GRACE_PERIOD_DURATION,
+                 seed=None):
+        k, t, o, p = num_worlds, num_targets, num_obstacles, max_projectiles
+        self.num_worlds = k
+        self.width = width
+        self.height = height
+        self.num_targets = t
+        self.num_obstacles = o
+        self.max_projectiles = p      # Per world; shots that find every slot taken are dropped
+        self.grace_period = grace_period
+        self.rng = np.random.default_rng(seed)   # One random stream for all the worlds
+        self.min_spawn_distance = min(width, height) * 0.4   # As in GameWorld.get_min_spawn_distance
+        self.target_range = min(width, height) * TARGET_SHOOTING_RANGE
+
+        # Free positions for spawning, found once per arena since obstacles don't move
+        self.samplers = [FreeSpaceSampler(width, height) for _ in range(k)]
+        self.target_spots = [None] * k   # (x, y) arrays of free target positions in each world
+        self.medkit_spots = [None] * k
+
+        # Per-world state
+        self.time = np.zeros(k)                        # Seconds since each world's episode began
+        self.player_x = np.zeros(k)
+        self.player_y = np.zeros(k)
+        self.health = np.zeros(k)
+        self.score = np.zeros(k, dtype=np.int64)
+        self.weapon = np.zeros(k, dtype=np.intp)       # Weapon code
+        self.last_shot_time = np.zeros(k)
+        self.medkit_x = np.zeros(k)
+        self.medkit_y = np.zeros(k)
+        self.medkit_active = np.zeros(k, dtype=bool)
+        self.obstacles = np.zeros((k, o, 4))           # Boxes (x, y, width, height)
+
+        # Per-world, per-target state
+        self.target_x = np.zeros((k, t))
+        self.target_y = np.zeros((k, t))
+        self.target_health = np.zeros((k, t))
+        self.target_alive = np.zeros((k, t), dtype=bool)
+        self.target_last_shot = np.zeros((k, t))
+        self.target_shot_delay = np.zeros((k, t))
+
+        # Per-world projectile slots, like ProjectilePool but with a row per world
+        self.proj_x = np.zeros((k, p))
+        self.proj_y = np.zeros((k, p))
+        self.proj_vx = np.zeros((k, p))
+        self.proj_vy = np.zeros((k, p))
+        self.proj_speed = np.zeros((k, p))
+        self.proj_distance = np.zeros((k, p))
+        self.proj_range = np.zeros((k, p))
+        self.proj_radius = np.zeros((k, p))
+        self.proj_damage = np.zeros((k, p))
+        self.proj_bullet = np.zeros((k, p), dtype=bool)   # Target bullet (True) or player paintball
+        self.proj_active = np.zeros((k, p), dtype=bool)
+
+        self.observation_size = 6 + 3 * t + 3 + 3 * o
+
+    def reset(self):
+        """Start a new episode in every world and return the observations"""
+        for k in range(self.num_worlds):
+            self._reset_world(k)
+        return self.observations()
+
+    def _reset_world(self, k):
+        """New arena, player and targets for world k"""
+        self.time[k] = 0
+        # The player starts with its corner at the arena center, like GameWorld.reset
+        self.player_x[k] = self.width // 2
+        self.player_y[k] = self.height // 2
+        self.health[k] = MAX_HEALTH
+        self.score[k] = 0
+        self.weapon[k] = 0
+        self.last_shot_time[k] = -np.inf
+        self.medkit_active[k] = False
+        self.proj_active[k] = False
+
+        # Obstacles clear of each other and of the player's start position
+        sampler = self.samplers[k]
+        sampler.clear()
+        center = (self.player_x[k] + PLAYER_SIZE // 2, self.player_y[k] + PLAYER_SIZE // 2)
+        self.obstacles[k] = (NOWHERE, NOWHERE, 0, 0)
+        for i in range(self.num_obstacles):
+            try:
+                x, y = sampler.sample(self.rng, OBSTACLE_SIZE, OBSTACLE_SIZE,
+                                      away_from=center, min_distance=OBSTACLE_SIZE)
+            except SpawnError:
+                break  # Arena is full: play with the obstacles that fit
+            sampler.add_boxes([(x, y, OBSTACLE_SIZE, OBSTACLE_SIZE)])
+            self.obstacles[k, i] = (x, y, OBSTACLE_SIZE, OBSTACLE_SIZE)
+        self.target_spots[k] = self._free_spots(sampler, TARGET_SIZE)
+        self.medkit_spots[k] = self._free_spots(sampler, MEDKIT_SIZE)
+
+        self.target_alive[k] = False
+        for i in range(self.num_targets):
+            self._spawn_target(k, i)
+
+    @staticmethod
+    def _free_spots(sampler, size):
+        """Top-left corners where a size x size box fits clear of obstacles, as (x, y) arrays"""
+        rows, cols = np.nonzero(sampler.free_positions(size, size))
+        return cols * float(sampler.resolution), rows * float(sampler.resolution)
+
+    def _spawn_target(self, k, i):
+        """Put a fresh target in slot i of world k, far enough from the player"""
+        spots_x, spots_y = self.target_spots[k]
+        center_x = self.player_x[k] + PLAYER_SIZE // 2
+        center_y = self.player_y[k] + PLAYER_SIZE // 2
+        chosen = None
+        if len(spots_x):
+            # A few random free spots nearly always include one far enough away;
+            # only if none is do we check every spot
+            pick = self.rng.integers(len(spots_x), size=16)
+            far = np.hypot(spots_x[pick] + TARGET_SIZE / 2 - center_x,
+                           spots_y[pick] + TARGET_SIZE / 2 - center_y) >= self.min_spawn_distance
+            if far.any():
+                chosen = pick[np.argmax(far)]
+            else:
+                far = np.flatnonzero(np.hypot(spots_x + TARGET_SIZE / 2 - center_x,
+                                              spots_y + TARGET_SIZE / 2 - center_y) >= self.min_spawn_distance)
+                if len(far):
+                    chosen = far[self.rng.integers(len(far))]
+        if chosen is None:
+            # No room for the target: it stays out of play until the next episode
+            self.target_alive[k, i] = False
+            self.target_x[k, i] = self.target_y[k, i] = NOWHERE
+            return
+        self.target_x[k, i] = spots_x[chosen]
+        self.target_y[k, i] = spots_y[chosen]
+        self.target_health[k, i] = TARGET_HEALTH
+        self.target_alive[k, i] = True
+        self.target_last_shot[k, i] = self.time[k]
+        self.target_shot_delay[k, i] = self.rng.uniform(0, TARGET_MAX_SHOT_DELAY)
+
+    def _spawn_medkit(self, k):
+        """Place the medkit of world k somewhere clear of obstacles"""
+        spots_x, spots_y = self.medkit_spots[k]
+        if len(spots_x):
+            chosen = self.rng.integers(len(spots_x))
+            self.medkit_x[k] = spots_x[chosen]
+            self.medkit_y[k] = spots_y[chosen]
+            self.medkit_active[k] = True
+
+    def _spawn_projectiles(self, worlds, x, y, angle, speed, max_range, radius, damage, bullet):
+        """Start projectiles in the given worlds (one entry per projectile; worlds may repeat)"""
+        if not len(worlds):
+            return
+        # Rank of each new projectile among those of its world, matched to that world's free slots
+        order = np.argsort(worlds, kind="stable")
+        sorted_worlds = worlds[order]
+        rank = np.arange(len(worlds)) - np.searchsorted(sorted_worlds, sorted_worlds)
+        free_first = np.argsort(self.proj_active, axis=1, kind="stable")
+        fits = rank < (~self.proj_active).sum(axis=1)[sorted_worlds]
+        order = order[fits]
+        w = sorted_worlds[fits]
+        s = free_first[w, rank[fits]]
+
+        angle = angle[order]
+        speed = np.broadcast_to(speed, worlds.shape)[order]
+        self.proj_x[w, s] = x[order]
+        self.proj_y[w, s] = y[order]
+        self.proj_vx[w, s] = np.cos(angle) * speed
+        self.proj_vy[w, s] = np.sin(angle) * speed
+        self.proj_speed[w, s] = speed
+        self.proj_distance[w, s] = 0
+        self.proj_range[w, s] = np.broadcast_to(max_range, worlds.shape)[order]
+        self.proj_radius[w, s] = radius
+        self.proj_damage[w, s] = np.broadcast_to(damage, worlds.shape)[order]
+        self.proj_bullet[w, s] = bullet
+        self.proj_active[w, s] = True
+
+    def _target_boxes(self):
+        """(worlds, targets, 4) boxes; targets out of play are far outside the arena"""
+        size = np.full(self.target_x.shape, float(TARGET_SIZE))
+        return np.stack((self.target_x, self.target_y, size, size), axis=-1)
+
+    def step(self, actions):
+        """Advance every world by one tick with its row of actions"""
+        actions = np.asarray(actions, dtype=float).reshape(self.num_worlds, ACTION_SIZE)
+        dt = TICK
+        self.time += dt
+        rewards = np.zeros(self.num_worlds)
+        grace = self.time < self.grace_period   # Each episode starts with a grace period
+
+        # Weapon switching
+        switch = np.clip(np.rint(actions[:, ACTION_WEAPON]).astype(np.intp), 0, len(WEAPONS))
+        self.weapon = np.where(switch > 0, switch - 1, self.weapon)
+
+        # Player movement with the same sliding rules as Player.move: each axis is blocked
+        # separately by obstacles, then again by targets
+        step = WEAPON_MOVE_SPEED[self.weapon] * dt
+        new_x = np.clip(self.player_x + np.sign(actions[:, ACTION_MOVE_X]) * step, 0, self.width - PLAYER_SIZE)
+        new_y = np.clip(self.player_y + np.sign(actions[:, ACTION_MOVE_Y]) * step, 0, self.height - PLAYER_SIZE)
+        target_boxes = self._target_boxes()
+
+        def blocked(boxes, x, y):
+            return boxes_overlap(boxes, x[:, None], y[:, None], PLAYER_SIZE, PLAYER_SIZE).any(axis=1)
+        x = np.where(blocked(self.obstacles, new_x, self.player_y), self.player_x, new_x)
+        y = np.where(blocked(self.obstacles, x, new_y), self.player_y, new_y)
+        x = np.where(blocked(target_boxes, new_x, y), x, new_x)
+        y = np.where(blocked(target_boxes, x, new_y), y, new_y)
+        self.player_x, self.player_y = x, y
+        center_x = x + PLAYER_SIZE // 2
+        center_y = y + PLAYER_SIZE // 2
+
+        # Player shooting (not during the grace period)
+        fire = ((actions[:, ACTION_FIRE] > 0.5) & ~grace &
+                (self.time - self.last_shot_time >= WEAPON_FIRE_DELAY[self.weapon]))
+        self.last_shot_time[fire] = self.time[fire]
+        # One entry per pellet: a shotgun's shooter is repeated once for each of its pellets
+        shooters = np.flatnonzero(fire)
+        shooters = np.repeat(shooters, WEAPON_PELLETS[self.weapon[shooters]])
+        weapon = self.weapon[shooters]
+        spread = WEAPON_SPREAD[weapon]
+        angle = actions[shooters, ACTION_AIM] + np.clip(
+            self.rng.normal(0, 1, len(shooters)) * (spread / 2), -spread, spread)
+        self._spawn_projectiles(shooters, center_x[shooters], center_y[shooters], angle,
+                                WEAPON_SPEED[weapon], WEAPON_RANGE[weapon], PAINTBALL_RADIUS,
+                                WEAPON_DAMAGE[weapon], False)
+
+        # Targets chase the player unless an obstacle is in the way (not during the grace period)
+        acting = ~grace[:, None] & self.target_alive
+        dx = center_x[:, None] - (self.target_x + TARGET_SIZE // 2)
+        dy = center_y[:, None] - (self.target_y + TARGET_SIZE // 2)
+        length = np.hypot(dx, dy)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            move = TARGET_SPEED * dt / length
+        chase_x = self.target_x + dx * move
+        chase_y = self.target_y + dy * move
+        clear = ~boxes_overlap(self.obstacles[:, None], chase_x[..., None], chase_y[..., None],
+                               TARGET_SIZE, TARGET_SIZE).any(axis=-1)
+        moving = acting & (length > 0) & clear
+        self.target_x = np.where(moving, chase_x, self.target_x)
+        self.target_y = np.where(moving, chase_y, self.target_y)
+
+        # Targets whose delay ran out fire at the player if it is in range
+        ready = acting & (self.time[:, None] - self.target_last_shot >= self.target_shot_delay)
+        self.target_last_shot = np.where(ready, self.time[:, None], self.target_last_shot)
+        self.target_shot_delay[ready] = self.rng.uniform(0, TARGET_MAX_SHOT_DELAY, ready.sum())
+        start_x = self.target_x + TARGET_SIZE // 2
+        start_y = self.target_y + TARGET_SIZE // 2
+        dx = center_x[:, None] - start_x
+        dy = center_y[:, None] - start_y
+        shooting_w, shooting_t = np.nonzero(ready & (np.hypot(dx, dy) <= self.target_range))
+        spread = np.clip(self.rng.normal(0, 1, len(shooting_w)) * (TARGET_MAX_ANGLE_VARIANCE / 2),
+                         -TARGET_MAX_ANGLE_VARIANCE, TARGET_MAX_ANGLE_VARIANCE)
+        self._spawn_projectiles(shooting_w, start_x[shooting_w, shooting_t], start_y[shooting_w, shooting_t],
+                                np.arctan2(dy, dx)[shooting_w, shooting_t] + spread,
+                                BULLET_SPEED, MAX_RANGE_BULLET, BULLET_RADIUS, BULLET_DAMAGE, True)
+
+        # Move every projectile (free slots too; that is cheaper than masking)
+        self.proj_x += self.proj_vx * dt
+        self.proj_y += self.proj_vy * dt
+        self.proj_distance += self.proj_speed * dt
+
+        # Collisions only look at live projectiles, as flat arrays with their world index
+        live_w, live_p = np.nonzero(self.proj_active)
+        x1 = self.proj_x[live_w, live_p]
+        y1 = self.proj_y[live_w, live_p]
+        x0 = x1 - self.proj_vx[live_w, live_p] * dt
+        y0 = y1 - self.proj_vy[live_w, live_p] * dt
+        radius = self.proj_radius[live_w, live_p]
+        distance = self.proj_distance[live_w, live_p]
+        max_range = self.proj_range[live_w, live_p]
+        damage = self.proj_damage[live_w, live_p]
+        bullet = self.proj_bullet[live_w, live_p]
+        expired = ((x1 < 0) | (x1 > self.width) | (y1 < 0) | (y1 > self.height) | (distance >= max_range))
+        step_length = self.proj_speed[live_w, live_p] * dt
+        limit = np.clip((max_range - (distance - step_length)) / step_length, 0, 1)  # Part of the path in range
+        path = (x0[:, None], y0[:, None], x1[:, None], y1[:, None], radius[:, None])
+
+        # Obstacles stop projectiles; anything further along the path is shielded
+        obstacle_time = swept_hit_times(*path, self.obstacles[live_w]).min(axis=1, initial=np.inf)
+        blocked_time = np.minimum(obstacle_time, limit)
+        spent = obstacle_time <= limit
+
+        # Paintballs hit the first live target on their path
+        target_times = swept_hit_times(*path, self._target_boxes()[live_w])
+        target_times[~self.target_alive[live_w]] = np.inf
+        first_target = target_times.argmin(axis=1)
+        target_time = target_times[np.arange(len(live_w)), first_target]
+        hits = np.flatnonzero(~bullet & (target_time < blocked_time))
+
+        # Hits on a target count in slot order until it is destroyed; later paintballs fly on,
+        # as in GameWorld.resolve_hits
+        hit_w, hit_t = live_w[hits], first_target[hits]
+        order = np.lexsort((live_p[hits], hit_t, hit_w))
+        hits, hit_w, hit_t = hits[order], hit_w[order], hit_t[order]
+        group = hit_w * self.num_targets + hit_t
+        group_start = np.ones(len(group), dtype=bool)
+        group_start[1:] = group[1:] != group[:-1]
+        damage_before = np.cumsum(damage[hits]) - damage[hits]
+        damage_before -= damage_before[np.maximum.accumulate(np.where(group_start, np.arange(len(group)), 0))]
+        counts = damage_before < self.target_health[hit_w, hit_t]
+        spent[hits[counts]] = True
+        np.subtract.at(self.target_health, (hit_w[counts], hit_t[counts]), damage[hits[counts]])
+
+        # Destroyed targets score and are replaced
+        destroyed = self.target_alive & (self.target_health <= 0)
+        self.target_alive &= ~destroyed
+        kills = destroyed.sum(axis=1)
+        self.score += kills
+        rewards += kills
+        for k, i in zip(*np.nonzero(destroyed)):
+            self._spawn_target(k, i)
+
+        # Bullets against the player
+        player_box = np.stack((x, y, np.full_like(x, PLAYER_SIZE), np.full_like(y, PLAYER_SIZE)), axis=-1)
+        player_time = swept_hit_times(x0, y0, x1, y1, radius, player_box[live_w])
+        player_hits = bullet & (player_time < blocked_time)
+        spent |= player_hits
+        damage_taken = np.bincount(live_w[player_hits], weights=damage[player_hits], minlength=self.num_worlds)
+        self.health -= damage_taken
+        rewards -= damage_taken / MAX_HEALTH
+        for k in np.flatnonzero((damage_taken > 0) & (self.health <= HEALTH_THRESHOLD) & ~self.medkit_active):
+            self._spawn_medkit(k)
+
+        # Remove spent and expired projectiles
+        gone = spent | expired
+        self.proj_active[live_w[gone], live_p[gone]] = False
+
+        # Medkit collection
+        picked = self.medkit_active & (
+            (self.medkit_x < x + PLAYER_SIZE) & (x < self.medkit_x + MEDKIT_SIZE) &
+            (self.medkit_y < y + PLAYER_SIZE) & (y < self.medkit_y + MEDKIT_SIZE))
+        self.health[picked] = MAX_HEALTH
+        self.medkit_active &= ~picked
+
+        # Finished episodes are reported and started again
+        dones = self.health <= 0
+        info = {"episode_score": np.where(dones, self.score, -1),
+                "episode_time": np.where(dones, self.time, np.nan)}
+        for k in np.flatnonzero(dones):
+            self._reset_world(k)
+        return self.observations(), rewards, dones, info
+
+    def observations(self):
+        """Observation row of every world (see the class docstring for the layout)"""
+        k, t, o = self.num_worlds, self.num_targets, self.num_obstacles
+        center_x = self.player_x + PLAYER_SIZE // 2
+        center_y = self.player_y + PLAYER_SIZE // 2
+        obs = np.zeros((k, self.observation_size), dtype=np.float32)
+        obs[:, 0] = self.player_x / self.width
+        obs[:, 1] = self.player_y / self.height
+        obs[:, 2] = self.health / MAX_HEALTH
+        obs[:, 3] = self.weapon
+        obs[:, 4] = self.time - self.last_shot_time >= WEAPON_FIRE_DELAY[self.weapon]
+        obs[:, 5] = self.time < self.grace_period
+
+        alive = self.target_alive
+        targets = obs[:, 6:6 + 3 * t].reshape(k, t, 3)
+        targets[..., 0] = np.where(alive, (self.target_x + TARGET_SIZE // 2 - center_x[:, None]) / self.width, 0)
+        targets[..., 1] = np.where(alive, (self.target_y + TARGET_SIZE // 2 - center_y[:, None]) / self.height, 0)
+        targets[..., 2] = np.where(alive, self.target_health / TARGET_HEALTH, 0)
+
+        medkit = 6 + 3 * t
+        active = self.medkit_active
+        obs[:, medkit] = active
+        obs[:, medkit + 1] = np.where(active, (self.medkit_x + MEDKIT_SIZE // 2 - center_x) / self.width, 0)
+        obs[:, medkit + 2] = np.where(active, (self.medkit_y + MEDKIT_SIZE // 2 - center_y) / self.height, 0)
+
+        exists = self.obstacles[..., 2] > 0
+        obstacles = obs[:, medkit + 3:].reshape(k, o, 3)
+        obstacles[..., 0] = exists
+        obstacles[..., 1] = np.where(exists, (self.obstacles[..., 0] + OBSTACLE_SIZE // 2
+                                              - center_x[:, None]) / self.width, 0)
+        obstacles[..., 2] = np.where(exists, (self.obstacles[..., 1] + OBSTACLE_SIZE // 2
+                                              - center_y[:, None]) / self.height, 0)
+        return obs
@@ -0,0 +1,74 @@
+import json
+import math
+import os
+import numpy as np
+
+# The player's weapons are data, not code: weapons.json lists them in the order of their
+# number keys, and every weapon's numbers become one entry of a column array here. The game
+# looks a value up by weapon index (WEAPONS.damage[player.weapon]), so a new weapon is a new
+# entry in the file and never another branch in the code that runs every tick.
+#
+# Fields of a weapon in weapons.json:
+#   name                 short name used in code and saved states ("medium", "long"...)
+#   label                name shown to the player
+#   damage               damage of each pellet
+#   range                pixels a pellet flies before it is removed
+#   projectile_speed     pixels per second
+#   spread               largest angle in degrees a pellet may stray from the aim
+#   fire_delay           seconds between shots
+#   move_speed           player speed in pixels per second while holding the weapon
+#   pellets              paintballs fired by one shot, each with its own spread
+#   sound                sound event played per shot (see audio.SOUNDS)
+#   color                color of the gun (red, green, blue)
+
+WEAPONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weapons.json")
+FIELDS = ("name", "label", "damage", "range", "projectile_speed", "spread", "fire_delay",
+          "move_speed", "pellets", "sound", "color")
+MAX_WEAPONS = 250   # Replay records store the weapon in one byte shared with other record kinds
+MAX_NAME_BYTES = 16 # Saved states store the weapon's name in this many bytes
+
+class WeaponTable:
+    """
+    Every weapon's parameters as columns indexed by weapon number
+    Numbers are NumPy arrays, so batches (VecShooterEnv, a shot of many pellets) read them
+    with one indexing operation; names, labels, sounds and colors are tuples
+    """
+    def __init__(self, weapons):
+        if not weapons:
+            raise ValueError("at least one weapon is needed")
+        if len(weapons) > MAX_WEAPONS:
+            raise ValueError(f"at most {MAX_WEAPONS} weapons are supported")
+        for weapon in weapons:
+            missing = [field for field in FIELDS if field not in weapon]
+            if missing:
+                raise ValueError(f"weapon {weapon.get('name', '?')!r} is missing {', '.join(missing)}")
+            if len(weapon["name"].encode()) > MAX_NAME_BYTES:
+                raise ValueError(f"weapon name {weapon['name']!r} is longer than {MAX_NAME_BYTES} bytes")
+            if weapon["pellets"] < 1:
+                raise ValueError(f"weapon {weapon['name']!r} must fire at least one pellet")
+        self.names = tuple(w["name"] for w in weapons)
+        if len(set(self.names)) < len(self.names):
+            raise ValueError("weapon names must be unique")
+        self.index = {name: i for i, name in enumerate(self.names)}  # Name -> weapon number
+        self.labels = tuple(w["label"] for w in weapons)
+        self.damage = np.array([w["damage"] for w in weapons], dtype=float)
+        self.range = np.array([w["range"] for w in weapons], dtype=float)
+        self.projectile_speed = np.array([w["projectile_speed"] for w in weapons], dtype=float)
+        self.spread = np.array([math.radians(w["spread"]) for w in weapons])  # Radians
+        self.fire_delay = np.array([w["fire_delay"] for w in weapons], dtype=float)
+        self.move_speed = np.array([w["move_speed"] for w in weapons], dtype=float)
+        self.pellets = np.array([w["pellets"] for w in weapons], dtype=np.intp)
+        self.sounds = tuple(w["sound"] for w in weapons)
+        self.colors = tuple(tuple(w["color"]) for w in weapons)
+
+    @classmethod
+    def load(cls, path=WEAPONS_FILE):
+        """Read the weapons listed in a JSON file"""
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.names)
+
+# The game's weapons, read once at startup
+WEAPONS = WeaponTable.load()
@@ -0,0 +1,788 @@
+import pygame
+import math
+import random
+import time
+import numpy as np
+from projectiles import ProjectilePool, OWNER_PLAYER, OWNER_TARGET
+from targets import TargetSwarm, TARGET_SIZE, TARGET_MAX_SHOT_DELAY
+from spatial_grid import SpatialGrid
+from flow_field import FlowField
+from chunks import ChunkedObstacles
+from spawning import FreeSpaceSampler, SpawnError
+from collision import earliest_hits, swept_hit_times
+from profiler import FrameProfiler
+from weapons import WEAPONS
+
+# The simulation lives here so it can run without a window, mixer or fonts:
+# shootergame.py drives it with keyboard/mouse input and draws it, while batch
+# runs and CI call GameWorld.step() directly as fast as the CPU allows.
+
+# Colors
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+BLACK = (0, 0, 0)
+GREEN = (0, 255, 0)
+
+# Default arena size (the window size the game starts with)
+ARENA_WIDTH = 1400
+ARENA_HEIGHT = 800
+
+# Simulation rate: the world always advances in fixed ticks of this length,
+# however fast the screen is redrawn. Speeds below are in pixels per second
+TICK_RATE = 120
+TICK = 1 / TICK_RATE   # Fixed timestep in seconds
+
+# Projectile properties
+PAINTBALL_RADIUS = 5   # Size of the player's paintballs
+BULLET_RADIUS = 4      # Bullets are smaller than paintballs
+BULLET_SPEED = 6000    # How fast target bullets move (pixels per second)
+BULLET_DAMAGE = 10     # Health lost by the player per bullet hit
+PROJECTILE_COLORS = (BLACK, RED)  # Indexed by owner: paintballs black, bullets red
+
+# The player's weapons (damage, range, spread, fire delay...) are listed in weapons.json
+# and read into the WEAPONS table (see weapons.py)
+
+TARGET_SPEED = 30  # How fast targets chase the player (pixels per second)
+TARGET_SHOOTING_RANGE = 0.6  # Targets fire at a player this close, as a fraction of the smaller arena side
+
+HEALTH_THRESHOLD = 20  # 20% health threshold for spawning medkit
+MAX_HEALTH = 100
+
+# Add near the top with other global variables
+MAX_RANGE_PAINTBALL = min(ARENA_WIDTH, ARENA_HEIGHT) * 1
+MAX_RANGE_BULLET = min(ARENA_WIDTH, ARENA_HEIGHT) * 1
+
+GRACE_PERIOD_DURATION = 5  # 5 seconds
+NUM_TARGETS = 3
+NUM_OBSTACLES = 6
+
+# Waves: every WAVE_DURATION seconds of play the next wave brings more, faster targets that
+# fire more often. Wave n has NUM_TARGETS + (n - 1) * WAVE_EXTRA_TARGETS targets, and their
+# speed and fire rate are (1 + (n - 1) * growth) times those of the first wave
+WAVE_DURATION = 30
+WAVE_EXTRA_TARGETS = 2
+WAVE_SPEED_GROWTH = 0.15
+WAVE_FIRE_RATE_GROWTH = 0.15
+
+# Chunked arenas (maps much bigger than the window)
+OBSTACLES_PER_CHUNK = 12   # Obstacles tried per chunk; ones that would overlap are dropped
+ACTIVE_CHUNKS = 2          # Chunks in play on each side of the player's chunk
+
+class PlayerInput:
+    """
+    Everything the player can do in one tick
+    shootergame.py fills this from the keyboard and mouse; headless runs build it directly
+    """
+    # One of these is made every tick, so it has fixed slots instead of an attribute dict
+    __slots__ = ("up", "down", "left", "right", "fire", "aim_x", "aim_y", "weapon", "restart")
+
+    def __init__(self, up=False, down=False, left=False, right=False, fire=False,
+                 aim_x=0, aim_y=0, weapon=None, restart=False):
+        self.up = up                   # W key
+        self.down = down               # S key
+        self.left = left               # A key
+        self.right = right             # D key
+        self.fire = fire               # Left mouse button held
+        self.aim_x = aim_x             # Point the player is aiming at
+        self.aim_y = aim_y
+        self.weapon = weapon           # Index in WEAPONS of the weapon to switch to, None to keep it
+        self.restart = restart         # SPACE pressed
+
+# Player class represents the user-controlled character in the game
+class Player:
+    # Fixed attribute slots: smaller objects, faster attribute access, and typos like
+    # player.helth = 0 raise an error instead of quietly adding a new attribute
+    __slots__ = ("id", "width", "height", "x", "y", "prev_x", "prev_y", "angle", "last_shot_time",
+                 "weapon", "health", "score", "shots_fired", "shots_hit", "rect")
+
+    def __init__(self, x, y, id=0):
+        self.id = id                       # Tells the players of a network game apart (0 for the first)
+        # Basic dimensions and positioning
+        self.width = 20                    # Player's width in pixels
+        self.height = 20                   # Player's height in pixels
+        self.x = x                         # Starting X position
+        self.y = y                         # Starting Y position
+        self.prev_x = x                    # Position at the start of the last tick (for drawing between ticks)
+        self.prev_y = y
+        self.angle = 0                     # Direction player is facing (in radians)
+        self.last_shot_time = -math.inf    # Tracks when the last shot was fired
+        self.weapon = 0                    # Index in WEAPONS; start with the first one listed (AR-15)
+        self.health = 100                  # Player starts with full health
+        self.score = 0                     # Track number of targets destroyed
+        self.shots_fired = 0               # Paintballs shot this round
+        self.shots_hit = 0                 # Paintballs that hit a target
+        # Collision rectangle, moved in place with the player instead of built for every check
+        self.rect = pygame.Rect(x, y, self.width, self.height)
+
+    def check_collision_with_targets(self, world, new_x, new_y):
+        """Check if moving to new_x, new_y would cause collision with any targets"""
+        # Only live targets bucketed in the grid cells around the new position are checked
+        return bool(world.grid.query(new_x, new_y, self.width, self.height, SpatialGrid.DYNAMIC))
+
+    def check_collision_with_obstacles(self, world, new_x, new_y):
+        """Check if moving to new_x, new_y would cause collision with any obstacles"""
+        # Only obstacles in the grid cells around the new position are checked
+        return bool(world.grid.query(new_x, new_y, self.width, self.height, SpatialGrid.STATIC))
+
+    def move(self, inputs, world, dt):
+        """Handle player movement based on this tick's input"""
+        # Store current position for collision checking
+        new_x = self.x
+        new_y = self.y
+
+        # Distance covered this tick at the current weapon's speed (heavier guns are slower)
+        current_speed = WEAPONS.move_speed[self.weapon] * dt
+
+        # Update position based on which keys are pressed
+        # Note: Negative y is up in pygame's coordinate system
+        if inputs.up:  # W key moves up
+            new_y -= current_speed
+        if inputs.down:  # S key moves down
+            new_y += current_speed
+        if inputs.left:  # A key moves left
+            new_x -= current_speed
+        if inputs.right:  # D key moves right
+            new_x += current_speed
+
+        # Keep player within arena bounds using min/max
+        # min() prevents going past right/bottom edge
+        # max() prevents going past left/top edge
+        new_x = max(0, min(new_x, world.width - self.width))
+        new_y = max(0, min(new_y, world.height - self.height))
+
+        # Check and handle collisions separately for x and y
+        # This allows sliding along obstacles instead of stopping completely
+        if not self.check_collision_with_obstacles(world, new_x, self.y):
+            self.x = new_x  # Update x if no collision
+        if not self.check_collision_with_obstacles(world, self.x, new_y):
+            self.y = new_y  # Update y if no collision
+
+        # Also check for collisions with targets
+        if not self.check_collision_with_targets(world, new_x, self.y):
+            self.x = new_x  # Update x if no collision
+        if not self.check_collision_with_targets(world, self.x, new_y):
+            self.y = new_y  # Update y if no collision
+        self.rect.update(self.x, self.y, self.width, self.height)
+
+    def aim(self, aim_x, aim_y):
+        """Turn the player to face the point aim_x, aim_y"""
+        # Calculate angle between player center and the aim point
+        # atan2 gives us the angle in radians, handling all quadrants correctly
+        dx = aim_x - (self.x + self.width // 2)
+        dy = aim_y - (self.y + self.height // 2)
+        self.angle = math.atan2(dy, dx)
+
+    def draw(self, screen, alpha=1, offset=(0, 0)):
+        """
+        Draw the player, their gun, and health bar, alpha of the way from the previous tick to this one
+        offset is the camera position. Returns the screen area that was drawn on
+        """
+        x = self.prev_x + (self.x - self.prev_x) * alpha - offset[0]
+        y = self.prev_y + (self.y - self.prev_y) * alpha - offset[1]
+
+        # Draw the player as a blue square
+        drawn = pygame.draw.rect(screen, BLUE, (x, y, self.width, self.height))
+
+        # Calculate center point of player for gun drawing
+        center_x = x + self.width // 2
+        center_y = y + self.height // 2
+
+        # Draw the gun as a line pointing where the player is aiming
+        gun_length = 20
+        # Use trigonometry to calculate end point of gun line
+        end_x = center_x + math.cos(self.angle) * gun_length
+        end_y = center_y + math.sin(self.angle) * gun_length
+        # Color gun based on weapon type (black=AR-15, yellow=Sniper...)
+        gun = pygame.draw.line(screen, WEAPONS.colors[self.weapon], (center_x, center_y), (end_x, end_y), 3)
+
+        # Draw health bar above player
+        health_bar_width = 50
+        health_bar_height = 5
+        health_percentage = max(0, self.health / 100)  # Calculate how full the bar should be
+        # Draw red background (empty health)
+        health_bar = pygame.draw.rect(screen, RED, (x - 15, y - 10, health_bar_width, health_bar_height))
+        # Draw green foreground (current health)
+        health_fill = pygame.draw.rect(screen, GREEN, (x - 15, y - 10,
+                                       health_bar_width * health_percentage, health_bar_height))
+        return drawn.unionall([gun, health_bar, health_fill])
+
+    def can_shoot(self, current_time):
+        """Check if enough time has passed to allow another shot"""
+        # Check if the current weapon's fire delay has passed since last shot
+        if current_time - self.last_shot_time >= WEAPONS.fire_delay[self.weapon]:
+            self.last_shot_time = current_time  # Reset timer
+            return True
+        return False
+
+    def calculate_shot_angles(self, rng):
+        """Calculate the angle of every pellet of a shot, each with its own random variance drawn from rng"""
+        # Get the maximum variance for current weapon (AR-15 2 degrees, Sniper 0.5...)
+        max_angle_variance = WEAPONS.spread[self.weapon]
+
+        # Generate random variance using normal distribution, one per pellet
+        # Using max_variance/2 as standard deviation means ~95% of pellets fall within ±max_variance
+        variance = rng.normal(0, max_angle_variance / 2, WEAPONS.pellets[self.weapon])
+
+        # Clamp variance to prevent extreme outliers, and add it to base angle
+        return self.angle + np.clip(variance, -max_angle_variance, max_angle_variance)
+
+# Add new Obstacle class after other class definitions
+class Obstacle:
+    """
+    Class representing static obstacles in the game
+    Obstacles block movement and projectiles
+    """
+    __slots__ = ("width", "height", "x", "y")
+
+    def __init__(self, x, y):
+        self.width = 60                # Width (3x player width)
+        self.height = 60               # Height (3x player height)
+        self.x = x                     # Position X
+        self.y = y                     # Position Y
+
+# Add after other class definitions
+class Medkit:
+    """
+    Class representing health pickup items
+    Spawns when player health is low and restores health when collected
+    """
+    __slots__ = ("width", "height", "x", "y", "active", "rect")
+
+    def __init__(self, x, y):
+        self.width = 20                # Same size as player
+        self.height = 20
+        self.x = x
+        self.y = y
+        self.active = True             # Whether medkit can be collected
+        self.rect = pygame.Rect(x, y, self.width, self.height)  # Collision rectangle
+
+    def place(self, x, y):
+        """Move the medkit (and its rectangle) to x, y and make it collectable again"""
+        self.x = x
+        self.y = y
+        self.active = True
+        self.rect.update(x, y, self.width, self.height)
+
+def entity_boxes(entities):
+    """Collision boxes (x, y, width, height) of a list of entities, in list order"""
+    return np.array([(e.x, e.y, e.width, e.height) for e in entities], dtype=float).reshape(-1, 4)
+
+class GameWorld:
+    """
+    The whole game simulation: player, targets, projectiles, obstacles and medkits
+    Call step() once per tick with that tick's PlayerInput. Nothing here needs a display,
+    sound device or fonts; sounds the game should play are reported in self.events
+
+    A network game (server.py) adds more players with add_player, and steps the world with
+    one PlayerInput per player. Targets go after the nearest player, each player scores
+    their own hits, and a player whose health runs out is down until the next round; the
+    game is over once every player is down
+
+    A chunked world is a map much bigger than the window, with num_obstacles per chunk
+    (see chunks.py). Only the chunks around the players are in play: collisions, spawning,
+    target routes and projectiles cover that area, so a tick costs the same on any map size
+
+    A world can also start from a saved state (see savestate.py) instead of a new arena;
+    its size, seed and everything else then come from the state
+    """
+    def __init__(self, width=ARENA_WIDTH, height=ARENA_HEIGHT,
+                 num_targets=NUM_TARGETS, num_obstacles=NUM_OBSTACLES, seed=None, chunked=False, state=None):
+        # Every random choice in the world comes from this one stream, so the same seed
+        # and the same inputs always play out the same way (see replay.py)
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.width = width                     # Arena size in pixels
+        self.height = height
+        self.num_targets = num_targets         # Targets alive at any time in the first wave
+        self.num_obstacles = num_obstacles
+        self.chunked = chunked                 # Whether the arena is a big map played a few chunks at a time
+        self.chunks = None                     # The map's ChunkedObstacles, if chunked
+        # Left, top, right and bottom of the area in play (set by load_area in a chunked arena)
+        self.area = (0, 0, 0, 0) if chunked else (0, 0, width, height)
+        self.obstacles = []                    # Obstacles in the area in play
+        self.players = []                      # Every player, in the order they joined (just one outside network play)
+        self.next_player_id = 1                # Id of the next player to join (the first player is 0)
+        self.time = 0.0                        # Simulated seconds since the world was created
+        self.arena_version = 0                 # Bumped whenever obstacles or arena size change
+        self.projectiles = ProjectilePool()    # Paintballs and target bullets share one pool
+        self.targets = TargetSwarm(self.rng)   # Every enemy target, updated as a batch
+        self.target_slots = np.zeros(0, dtype=np.intp)  # Target slot of each box in the grid's dynamic layer
+        # These cover the area in play, resized whenever it changes (see index_obstacles)
+        area_width, area_height = self.area[2], self.area[3]
+        self.grid = SpatialGrid(area_width, area_height)  # Collision grid: obstacles static, targets dynamic
+        self.free_space = FreeSpaceSampler(area_width, area_height)  # Where new things can spawn
+        self.flow_field = FlowField(area_width, area_height, TARGET_SIZE)  # Targets' routes to the player
+        # Caps on live targets and projectiles, set by a BudgetGovernor (None means no cap)
+        self.max_targets = None
+        self.max_projectiles = None
+        self.medkits = []                      # Medkits waiting to be collected
+        self.medkit_rects = []                 # Rect of each medkit in self.medkits, for collidelistall
+        self.spare_medkits = []                # Collected medkits, reused by the next spawn
+        self.events = []                       # Sound events produced by the last step
+        self.profiler = None                   # FrameProfiler timing the phases of step(), if any
+        if state is None:
+            self.reset()
+        else:
+            import savestate  # It builds on this module
+            savestate.restore(self, state)
+
+    def reset(self, new_arena=True):
+        """Start a new round; with new_arena the obstacles are re-rolled and the grace period restarts"""
+        # Reset players: the first starts at the arena center, and any others (network play)
+        # are placed once the obstacles are in, keeping their ids
+        ids = [player.id for player in self.players] or [0]
+        self.players = [Player(self.width // 2, self.height // 2, ids[0])]
+        # Reset projectiles
+        self.projectiles.clear()
+        if new_arena:
+            if self.chunked:
+                # A new map, whose chunks are only generated once the player comes near them
+                player = self.player
+                self.chunks = ChunkedObstacles(self.width, self.height, int(self.rng.integers(2**63)),
+                                               self.num_obstacles,
+                                               keep_clear=(player.x + player.width // 2,
+                                                           player.y + player.height // 2))
+                self.area = None
+            else:
+                # Reset obstacles
+                self.obstacles = []
+                self.free_space.clear()
+                for _ in range(self.num_obstacles):
+                    try:
+                        self.obstacles.append(self.place_obstacle())
+                    except SpawnError as e:
+                        # Arena is full (e.g. a very small window): play with the obstacles that fit
+                        print(f"Warning: placed only {len(self.obstacles)} obstacles. {e}")
+                        break
+                self.index_obstacles()
+            # Reset game state
+            # Clear any existing medkits, keeping them for reuse
+            self.spare_medkits.extend(self.medkits)
+            self.medkits = []
+            self.medkit_rects = []
+            self.grace_period = True
+            self.grace_period_start = self.time
+        # Back to the first wave, whose clock starts once any grace period is over
+        self.wave = 1
+        self.wave_start = self.time
+        # Reset targets
+        self.targets.clear()
+        if self.chunked:
+            self.load_area()  # The player is back at the map center
+        for player_id in ids[1:]:
+            self.players.append(self.spawn_player(player_id))
+        self.fill_targets()
+        self.index_targets()
+        self.game_over = False
+
+    @property
+    def player(self):
+        """The first player (the only one outside network play)"""
+        return self.players[0]
+
+    def active_players(self):
+        """The players still in the round (not down)"""
+        return [player for player in self.players if player.health > 0]
+
+    def add_player(self):
+        """Bring another player into the arena (network play) and return it"""
+        player = self.spawn_player(self.next_player_id)
+        self.next_player_id += 1
+        self.players.append(player)
+        return player
+
+    def remove_player(self, player):
+        """Take a player out of the arena (network play); the world always keeps one player"""
+        if len(self.players) > 1:
+            self.players.remove(player)
+            if not self.active_players():
+                self.game_over = True  # Only players who were already down are left
+
+    def spawn_player(self, player_id):
+        """A player clear of obstacles and, if there is room, away from the targets"""
+        targets = self.targets
+        live = targets.live()
+        centers = np.column_stack((targets.x[live] + targets.width // 2, targets.y[live] + targets.height // 2))
+        try:
+            x, y = self.free_space.sample(self.rng, 20, 20, away_from=centers,
+                                          min_distance=self.get_min_spawn_distance() / 2)
+        except SpawnError:
+            x, y = self.free_space.sample(self.rng, 20, 20)
+        return Player(x, y, player_id)
+
+    def resize(self, width, height):
+        """Change the arena size (the window was resized); chunked arenas keep their size"""
+        if self.chunked:
+            return  # A big map is never the size of the window
+        self.width = width
+        self.height = height
+        self.area = (0, 0, width, height)
+        # Update player positions to stay in bounds if needed
+        for player in self.players:
+            player.x = min(player.x, width - player.width)
+            player.y = min(player.y, height - player.height)
+            player.rect.update(player.x, player.y, player.width, player.height)
+        self.index_obstacles()
+        self.index_targets()
+
+    def load_area(self):
+        """
+        Put the chunks around the players in play, if they aren't already (chunked arenas only)
+        Targets the players have left behind outside the new area respawn inside it
+        """
+        players = self.active_players() or self.players
+        size = self.chunks.chunk_size
+        cols = [int(player.x + player.width // 2) // size for player in players]
+        rows = [int(player.y + player.height // 2) // size for player in players]
+        # One rectangle of chunks covering every player (players far apart make it a big one)
+        area = (max(0, (min(cols) - ACTIVE_CHUNKS) * size), max(0, (min(rows) - ACTIVE_CHUNKS) * size),
+                min(self.width, (max(cols) + ACTIVE_CHUNKS + 1) * size),
+                min(self.height, (max(rows) + ACTIVE_CHUNKS + 1) * size))
+        if area == self.area:
+            return
+        self.area = left, top, right, bottom = area
+        self.obstacles = [Obstacle(int(x), int(y))
+                          for x, y, _, _ in self.chunks.boxes_in(left, top, right - 1, bottom - 1).tolist()]
+        self.index_obstacles()
+
+        targets = self.targets
+        live = targets.live()
+        outside = live[(targets.x[live] < left) | (targets.x[live] + targets.width > right) |
+                       (targets.y[live] < top) | (targets.y[live] + targets.height > bottom)]
+        for i in outside:
+            targets.kill(i)
+        self.fill_targets()
+        self.index_targets()
+
+    def index_obstacles(self):
+        """Index the obstacles of the area in play for collisions, spawning and target routes"""
+        left, top, right, bottom = self.area
+        boxes = entity_boxes(self.obstacles)
+        self.grid.resize(right - left, bottom - top, left, top)
+        self.grid.set_static(boxes)
+        self.free_space.resize(right - left, bottom - top, left, top)
+        self.free_space.add_boxes(boxes)
+        self.flow_field.resize(right - left, bottom - top, left, top, boxes)
+        self.arena_version += 1
+
+    def obstacle_boxes_in(self, left, top, right, bottom):
+        """Boxes of (at least) the obstacles overlapping the area left, top - right, bottom, for drawing"""
+        if self.chunked:
+            return self.chunks.boxes_in(left, top, right, bottom)
+        return entity_boxes(self.obstacles)
+
+    def play_size(self):
+        """
+        Arena size that spawn distances and target ranges scale with: the smaller side of the
+        arena, or of the default window for a chunked arena
+        """
+        if self.chunked:
+            return min(ARENA_WIDTH, ARENA_HEIGHT)
+        return min(self.width, self.height)
+
+    def index_targets(self):
+        """Re-bucket the live targets in the grid's dynamic layer"""
+        self.target_slots = self.targets.live()
+        self.grid.set_dynamic(self.targets.boxes(self.target_slots))
+
+    def get_min_spawn_distance(self):
+        # Calculate 40% of the smallest arena dimension
+        return self.play_size() * 0.4
+
+    def wave_targets(self):
+        """Number of targets the current wave keeps alive, within the budget cap"""
+        count = self.num_targets + (self.wave - 1) * WAVE_EXTRA_TARGETS
+        return count if self.max_targets is None else min(count, self.max_targets)
+
+    def wave_speed(self):
+        """Chase speed of the current wave's targets"""
+        return TARGET_SPEED * (1 + (self.wave - 1) * WAVE_SPEED_GROWTH)
+
+    def wave_shot_delay(self):
+        """Longest delay between shots of the current wave's targets"""
+        return TARGET_MAX_SHOT_DELAY / (1 + (self.wave - 1) * WAVE_FIRE_RATE_GROWTH)
+
+    def next_wave(self):
+        """Start the next wave: every target speeds up and fires faster, and new ones join"""
+        self.wave += 1
+        self.wave_start = self.time
+        live = self.targets.live()
+        self.targets.speed[live] = self.wave_speed()
+        self.targets.max_shot_delay[live] = self.wave_shot_delay()
+        self.fill_targets()
+        self.index_targets()
+
+    def fill_targets(self):
+        """Spawn targets until the current wave's number is alive (call index_targets after)"""
+        for _ in range(self.wave_targets() - len(self.targets)):
+            self.spawn_target()
+
+    def set_budget(self, max_targets, max_projectiles):
+        """
+        Cap the live targets and projectiles (from a BudgetGovernor)
+        Targets beyond a lowered cap are removed right away, furthest from the players first.
+        Targets don't fire while the projectiles are at their cap; the player always can
+        """
+        self.max_targets = max_targets
+        self.max_projectiles = max_projectiles
+        excess = len(self.targets) - self.wave_targets()
+        if excess > 0:
+            players = self.active_players() or self.players
+            player_x = np.array([[player.x] for player in players])
+            player_y = np.array([[player.y] for player in players])
+            live = self.targets.live()
+            # Distance to the nearest player
+            distance = np.hypot(self.targets.x[live] - player_x, self.targets.y[live] - player_y).min(axis=0)
+            for i in live[np.argsort(distance)[len(live) - excess:]]:
+                self.targets.kill(i)
+        else:
+            self.fill_targets()
+        self.index_targets()
+
+    def spawn_target(self):
+        """Spawn a target of the current wave clear of obstacles and away from the players; returns its slot"""
+        player_centers = [(player.x + player.width // 2, player.y + player.height // 2) for player in self.players]
+        x, y = self.free_space.sample(self.rng, TARGET_SIZE, TARGET_SIZE,
+                                      away_from=player_centers, min_distance=self.get_min_spawn_distance())
+        # Targets can only shoot if the player is within 60% of arena size
+        return self.targets.spawn(x, y, self.time, self.play_size() * TARGET_SHOOTING_RANGE,
+                                  self.wave_speed(), self.wave_shot_delay())
+
+    def spawn_medkit(self):
+        """Spawn a medkit somewhere clear of obstacles"""
+        x, y = self.free_space.sample(self.rng, 20, 20)
+        if not self.spare_medkits:
+            return Medkit(x, y)
+        # Reuse a collected medkit instead of allocating a new one
+        medkit = self.spare_medkits.pop()
+        medkit.place(x, y)
+        return medkit
+
+    def place_obstacle(self):
+        """Place an obstacle clear of other obstacles and of the player's start position"""
+        player = self.player
+        player_center = (player.x + player.width // 2, player.y + player.height // 2)
+        # Centers 60px apart are enough to keep a 60px obstacle off the 20px player
+        x, y = self.free_space.sample(self.rng, 60, 60, away_from=player_center, min_distance=60)
+        self.free_space.add_boxes([(x, y, 60, 60)])
+        return Obstacle(x, y)
+
+    def step(self, dt, inputs):
+        """
+        Advance the simulation by one tick of dt seconds using the player's input, or in
+        network play a list of inputs, one for each of self.players (in the same order)
+        """
+        self.events = []
+        self.time += dt
+        if not isinstance(inputs, list):
+            inputs = [inputs]
+        # Players without an input this tick stand still
+        inputs = inputs + [PlayerInput()] * (len(self.players) - len(inputs))
+
+        if any(player_input.restart for player_input in inputs):
+            # SPACE after game over starts a fresh arena; during play it only resets the round
+            self.reset(new_arena=self.game_over)
+            return
+        if self.game_over:
+            return
+
+        projectiles = self.projectiles
+        profiler = self.profiler
+
+        # Check if grace period is over
+        if self.grace_period and self.time - self.grace_period_start >= GRACE_PERIOD_DURATION:
+            self.grace_period = False
+            self.wave_start = self.time
+        # Next wave once this one has been played long enough
+        if not self.grace_period and self.time - self.wave_start >= WAVE_DURATION:
+            self.next_wave()
+
+        # Handle weapon switching and player movement (players who are down sit the round out)
+        for player, player_input in zip(self.players, inputs):
+            if player.health <= 0:
+                continue
+            if player_input.weapon is not None:
+                player.weapon = player_input.weapon
+            player.prev_x = player.x
+            player.prev_y = player.y
+            player.move(player_input, self, dt)
+            player.aim(player_input.aim_x, player_input.aim_y)
+        if self.chunked:
+            self.load_area()  # Only does anything when a player has entered another chunk
+
+        # Handle shooting (only if grace period is over); every pellet of the shot (one for
+        # most weapons, a spread of them for a shotgun) is spawned in one batch
+        for player, player_input in zip(self.players, inputs):
+            if (not self.grace_period and player.health > 0 and player_input.fire
+                    and player.can_shoot(self.time)):
+                weapon = player.weapon
+                shot_angles = player.calculate_shot_angles(self.rng)
+                projectiles.spawn_many(player.x + player.width // 2, player.y + player.height // 2, shot_angles,
+                                       WEAPONS.projectile_speed[weapon], WEAPONS.range[weapon],
+                                       PAINTBALL_RADIUS, OWNER_PLAYER, WEAPONS.damage[weapon], player.id)
+                self.events.append(WEAPONS.sounds[weapon])
+                player.shots_fired += len(shot_angles)
+        if profiler:
+            profiler.mark("player")
+
+        # Target movement and turret shooting only once the grace period is over
+        if not self.grace_period:
+            players = self.active_players()
+            # Routes are only searched again when a player has entered another cell
+            self.flow_field.update([player.x + player.width // 2 for player in players],
+                                   [player.y + player.height // 2 for player in players])
+            self.targets.chase(players, self.grid, self.flow_field, dt)
+            self.index_targets()
+            start_x, start_y, shot_angle = self.targets.shoot(players, self.time)
+            if self.max_projectiles is not None:
+                # Shots beyond the budget cap are not fired
+                room = max(0, self.max_projectiles - len(projectiles))
+                start_x, start_y, shot_angle = start_x[:room], start_y[:room], shot_angle[:room]
+            # Create bullets travelling along the shot angles
+            projectiles.spawn_many(start_x, start_y, shot_angle, BULLET_SPEED, MAX_RANGE_BULLET,
+                                   BULLET_RADIUS, OWNER_TARGET, BULLET_DAMAGE)
+            self.events.extend(["target_shot"] * len(shot_angle))
+        if profiler:
+            profiler.mark("targets")
+
+        # Move every paintball and bullet in one step; they expire on leaving the area in play
+        expired = projectiles.step(dt, *self.area)
+        if profiler:
+            profiler.mark("projectiles")
+        self.resolve_hits(expired)
+        if profiler:
+            profiler.mark("hits")
+
+        # Check for medkit collection, against all medkit rects in one call
+        # (backwards, so removing one doesn't shift the indices still to come)
+        for player in self.active_players():
+            for i in reversed(player.rect.collidelistall(self.medkit_rects)):
+                medkit = self.medkits.pop(i)
+                del self.medkit_rects[i]
+                player.health = MAX_HEALTH
+                medkit.active = False
+                self.spare_medkits.append(medkit)
+        if profiler:
+            profiler.mark("medkits")
+
+    def resolve_hits(self, expired):
+        """
+        Apply hits along the path each projectile travelled this tick and free the spent ones,
+        together with the expired slots that ProjectilePool.step reported
+        """
+        # Checking the whole path means fast sniper rounds cannot skip
+        # over a target or obstacle between two ticks
+        projectiles = self.projectiles
+        grid = self.grid
+        targets = self.targets
+        shooters = {player.id: player for player in self.players}  # Players who left score nothing
+
+        live = projectiles.live()
+        x0 = projectiles.prev_x[live]
+        y0 = projectiles.prev_y[live]
+        x1 = projectiles.x[live]
+        y1 = projectiles.y[live]
+        radius = projectiles.radius[live]
+        owner = projectiles.owner[live]
+        limit = projectiles.path_limit(live)  # Part of the path still within range
+
+        # Which live projectiles to free once all hits are resolved; one flag each, so a
+        # projectile that both hits something and expires is only freed once
+        spent = np.zeros(len(live), dtype=bool)
+        spent[np.searchsorted(live, expired)] = True  # Both are sorted slot indices
+
+        # First obstacle on each path; anything further along the path than it is shielded
+        _, obstacle_time = earliest_hits(x0, y0, x1, y1, radius, grid, SpatialGrid.STATIC)
+        blocked_time = np.minimum(obstacle_time, limit)
+        spent |= obstacle_time <= limit
+
+        # First target on each paintball's path (the dynamic layer is current after movement)
+        target_index, target_time = earliest_hits(x0, y0, x1, y1, radius, grid, SpatialGrid.DYNAMIC)
+        destroyed = set()  # Target slots destroyed earlier in this loop
+        for q in np.flatnonzero((owner == OWNER_PLAYER) & (target_time < blocked_time)):
+            t = self.target_slots[target_index[q]]
+            if t in destroyed:
+                continue  # Its target is already gone, so the paintball keeps flying
+            targets.health[t] -= projectiles.damage[live[q]]  # Damage of the weapon that fired it
+            shooter = shooters.get(int(projectiles.shooter[live[q]]))
+            if shooter:
+                shooter.shots_hit += 1
+            spent[q] = True
+
+            # Check if target is destroyed
+            if targets.health[t] <= 0:
+                targets.kill(t)
+                if shooter:
+                    shooter.score += 1
+                destroyed.add(t)
+
+        # Replace destroyed targets once all hits are resolved, so freed slots are not reused mid-loop
+        if destroyed:
+            self.fill_targets()
+            self.index_targets()
+
+        # Check bullets against the players still in the round; each stops at the first it meets
+        players = self.active_players()
+        hit_times = swept_hit_times(x0[:, None], y0[:, None], x1[:, None], y1[:, None], radius[:, None],
+                                    entity_boxes(players))
+        hit_player = np.argmin(hit_times, axis=1) if players else np.zeros(len(live), dtype=np.intp)
+        player_time = hit_times.min(axis=1, initial=np.inf)
+        for q in np.flatnonzero((owner == OWNER_TARGET) & (player_time < blocked_time)):
+            player = players[hit_player[q]]
+            spent[q] = True
+            player.health -= projectiles.damage[live[q]]
+            self.events.append("player_hit")
+
+            # Check if health is low and no medkits are active
+            if player.health <= HEALTH_THRESHOLD and not self.medkits:
+                medkit = self.spawn_medkit()
+                self.medkits.append(medkit)
+                self.medkit_rects.append(medkit.rect)
+
+            if player.health <= 0 and not self.game_over and not self.active_players():
+                self.game_over = True
+                self.events.append("game_over")
+
+        # Remove spent projectiles
+        projectiles.free(live[spent])
+
+def run_headless(ticks, seed=None, profile=None):
+    """
+    Run a world with an idle player for a number of ticks and report how fast it stepped
+    If profile is a file name, every tick is profiled as one frame and the last ones are
+    written there (JSON if it ends in .json, CSV otherwise)
+    """
+    world = GameWorld(seed=seed)
+    idle = PlayerInput()
+    profiler = None
+    if profile:
+        profiler = world.profiler = FrameProfiler(capacity=ticks)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        if profiler:
+            profiler.begin_frame()
+        world.step(TICK, idle)
+        if profiler:
+            profiler.end_frame(world)
+    elapsed = time.perf_counter() - start
+    print(f"{ticks} ticks in {elapsed:.3f}s ({ticks / elapsed:.0f} ticks/s), "
+          f"simulated {world.time:.1f}s, score {world.player.score}, health {world.player.health}")
+    if profiler:
+        profiler.export(profile)
+        summary = profiler.summary()
+        print(f"tick p50 {summary['work_ms_p50']:.3f} ms, p99 {summary['work_ms_p99']:.3f} ms; "
+              + ", ".join(f"{phase} {ms:.3f}" for phase, ms in summary["phase_ms_mean"].items() if ms))
+    return world
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Step the game simulation without a window or sound")
+    parser.add_argument("--ticks", type=int, default=10000, help="number of fixed ticks to simulate")
+    parser.add_argument("--seed", type=int, default=None, help="seed for repeatable runs")
+    parser.add_argument("--profile", default=None,
+                        help="write per-tick phase timings to this file (.json or .csv)")
+    args = parser.parse_args()
+    run_headless(args.ticks, args.seed, args.profile)